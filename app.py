@@ -1,10 +1,10 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
 import pandas as pd
-import kagglehub
 import os
+from streamlit.errors import StreamlitSecretNotFoundError
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from olist import clientes, cubo, dados, exportacao, geografia, graficos, indice, instrumentacao, paginacao, painel, temporal, vega
 
 st.set_page_config(
     page_title="Dashboard Mercado Olist",
@@ -47,42 +47,104 @@ st.markdown("""
 
 st.title('🛒 Dashboard das Análises do Mercado Olist')
 
-caminho = kagglehub.dataset_download("olistbr/brazilian-ecommerce")
-arquivos = sorted(os.listdir(caminho))
-clientes = pd.read_csv(os.path.join(caminho, arquivos[0]))
-itens = pd.read_csv(os.path.join(caminho, arquivos[2]))
-pagamentos = pd.read_csv(os.path.join(caminho, arquivos[3]))
-reviews = pd.read_csv(os.path.join(caminho, arquivos[4]))
-pedidos = pd.read_csv(os.path.join(caminho, arquivos[5]))
-produtos = pd.read_csv(os.path.join(caminho, arquivos[6]))
-categorias = pd.read_csv(os.path.join(caminho, arquivos[8]))
-
-tabela_final = (
-    clientes
-    .merge(pedidos, on='customer_id', how='left')
-    .merge(itens, on='order_id', how='left')
-    .merge(produtos, on='product_id', how='left')
-    .merge(pagamentos, on='order_id', how='left')
-    .merge(reviews, on='order_id', how='left')
+contexto_execucao = get_script_run_ctx()
+medidor = instrumentacao.Medidor(
+    ativo=instrumentacao.instrumentacao_ativa(st.query_params.to_dict()),
+    sessao=contexto_execucao.session_id if contexto_execucao else None
 )
-tabela_final = tabela_final[[
-    'customer_unique_id',
-    'order_id',
-    'product_category_name',
-    'price',
-    'freight_value',
-    'payment_type',
-    'payment_installments',
-    'payment_value',
-    'order_status',
-    'review_score'
-]]
 
-tabela_final = tabela_final[
-    (tabela_final['payment_type'].notna()) & 
-    (tabela_final['payment_type'] != 'not_defined') &
-    (tabela_final['review_score'].notna())
-]
+@st.cache_resource
+def ultima_carga():
+    return {}
+
+@st.cache_resource(show_spinner="Carregando dados da Olist...", max_entries=1)
+def carregar_dados_compartilhados(chave, caminho, versao, grao, incremental):
+    instrumentacao.registrar_falha_cache()
+    anterior = ultima_carga().get((chave, grao))
+    if incremental and anterior is not None:
+        dados_olist = dados.atualizar_dados(anterior, caminho, versao, grao, chave=chave)
+    else:
+        dados_olist = dados.carregar_dados(caminho, versao, grao, incremental=incremental, chave=chave)
+    ultima_carga().clear()
+    ultima_carga()[(chave, grao)] = dados_olist
+    return dados_olist
+
+@st.cache_resource(max_entries=32)
+def ordem_linhas_compartilhada(_tabela, versao, grao, coluna, crescente):
+    instrumentacao.registrar_falha_cache()
+    ordem = paginacao.ordem_linhas(_tabela[coluna], crescente)
+    ordem.flags.writeable = False
+    return ordem
+
+@st.cache_resource(max_entries=1)
+def base_graficos_compartilhada(_cubo, versao, grao):
+    instrumentacao.registrar_falha_cache()
+    return painel.base_graficos(_cubo)
+
+@st.cache_resource(max_entries=32)
+def posicoes_filtradas_compartilhadas(_indice, versao, grao, categorias, pagamento, reviews):
+    instrumentacao.registrar_falha_cache()
+    posicoes = indice.filtrar_posicoes(_indice, categorias, pagamento, reviews)
+    if posicoes is not None:
+        posicoes.flags.writeable = False
+    return posicoes
+
+@st.cache_resource(max_entries=32)
+def selecao_clientes_compartilhada(_clientes, versao, grao, categorias, pagamento, reviews):
+    instrumentacao.registrar_falha_cache()
+    mascara = clientes.selecao(_clientes, list(categorias), pagamento, list(reviews))
+    mascara.flags.writeable = False
+    return mascara
+
+# Cada perfil ocupa dezenas de MB nas escalas maiores; só os mais recentes ficam em memória.
+@st.cache_resource(max_entries=2)
+def perfis_clientes_compartilhados(_clientes, versao, grao, categorias, pagamento, reviews):
+    instrumentacao.registrar_falha_cache()
+    mascara = selecao_clientes_compartilhada(_clientes, versao, grao, categorias, pagamento, reviews)
+    return clientes.perfil_selecionado(_clientes, mascara)
+
+@st.cache_resource(ttl=3600)
+def origem_resolvida(configurada):
+    return dados.resolver_origem(configurada)
+
+def origem_configurada():
+    if os.environ.get("OLIST_DADOS"):
+        return os.environ["OLIST_DADOS"]
+    try:
+        return st.secrets.get("OLIST_DADOS")
+    except StreamlitSecretNotFoundError:
+        return None
+
+with medidor.etapa('origem'):
+    configurada = origem_configurada()
+    caminho = origem_resolvida(configurada)
+grao = os.environ.get("OLIST_GRAO", "item")
+atualizacao_incremental = os.environ.get("OLIST_ATUALIZACAO", "completa") == "incremental"
+with medidor.etapa('carga', cache=True) as etapa:
+    dados_olist = carregar_dados_compartilhados(
+        dados.chave_origem(configurada),
+        caminho,
+        dados.versao_dataset(caminho),
+        grao,
+        atualizacao_incremental
+    )
+    etapa['linhas'] = len(dados_olist.tabela_final)
+tabela_final = dados_olist.tabela_final
+indice_filtros = dados_olist.indice
+cubo_olap = dados_olist.cubo
+
+if 'delta' in dados_olist.tempos:
+    st.caption(
+        f"Leitura dos arquivos: {dados_olist.tempos['leitura']:.2f}s · "
+        f"Atualização incremental: {dados_olist.tempos['delta']:.2f}s"
+    )
+elif 'snapshot' in dados_olist.tempos:
+    st.caption(f"Snapshot colunar carregado em {dados_olist.tempos['snapshot']:.2f}s")
+else:
+    st.caption(
+        f"Leitura dos arquivos: {dados_olist.tempos['leitura']:.2f}s · "
+        f"Junção das tabelas: {dados_olist.tempos['merge']:.2f}s"
+    )
 
 st.markdown("---")
 st.subheader("🔍 Filtros de Análise")
@@ -93,7 +155,7 @@ with st.container():
     with col1:
         checkbox_cat = st.checkbox("📦 Categoria do Produto", value=False, disabled=False, key='cb_cat')
         if checkbox_cat:
-            tipos = sorted(tabela_final['product_category_name'].dropna().unique())
+            tipos = sorted(indice_filtros.categorias)
             categorias_selecionadas = st.multiselect(
                 'Selecione uma ou mais categorias:',
                 tipos,
@@ -105,7 +167,7 @@ with st.container():
     with col2:
         checkbox_pag = st.checkbox("💳 Tipos de Pagamento", value=False, disabled=False, key='cb_pag')
         if checkbox_pag:
-            pagamentos = sorted(tabela_final['payment_type'].dropna().unique())
+            pagamentos = sorted(indice_filtros.pagamentos)
             pagamento_selecionado = st.segmented_control(
                 'Selecione o tipo:',
                 pagamentos,
@@ -117,7 +179,7 @@ with st.container():
     with col3:
         checkbox_rev = st.checkbox("⭐ Reviews", value=False, disabled=False, key='cb_rev')
         if checkbox_rev:
-            reviews = sorted(tabela_final['review_score'].unique())
+            reviews = sorted(indice_filtros.reviews)
             reviews_selecionadas = st.multiselect(
                 'Selecione uma ou mais notas:',
                 reviews,
@@ -126,414 +188,392 @@ with st.container():
         else:
             reviews_selecionadas = []
 
+with medidor.etapa('filtro', cache=True) as etapa:
+    posicoes_filtradas = posicoes_filtradas_compartilhadas(
+        indice_filtros,
+        dados_olist.versao,
+        grao,
+        tuple(sorted(categorias_selecionadas)),
+        pagamento_selecionado,
+        tuple(sorted(reviews_selecionadas))
+    )
+    if posicoes_filtradas is None:
+        total_filtrado = indice_filtros.total
+    else:
+        total_filtrado = len(posicoes_filtradas)
+    
+    fatia = cubo.fatiar(
+        cubo_olap,
+        categorias_selecionadas,
+        pagamento_selecionado,
+        reviews_selecionadas
+    )
+    etapa['linhas'] = total_filtrado
+
+contagem_aproximada = os.environ.get("OLIST_CONTAGEM", "exata") == "aproximada"
+graficos_interativos = os.environ.get("OLIST_GRAFICOS", "matplotlib") == "vega"
+
 st.markdown("---")
 
-aba_tabela, aba_visualizacao = st.tabs(["📋 Tabela de Dados", "📈 Visualizações"])
+aba_tabela, aba_visualizacao, aba_temporal, aba_regioes, aba_clientes = st.tabs(
+    ["📋 Tabela de Dados", "📈 Visualizações", "📅 Séries Temporais", "🗺️ Regiões", "👥 Clientes"]
+)
 
 with aba_tabela:
-    df_tabela = tabela_final.copy()
-    if categorias_selecionadas:
-        df_tabela = df_tabela[df_tabela['product_category_name'].isin(categorias_selecionadas)]
-    
-    if pagamento_selecionado:
-        df_tabela = df_tabela[df_tabela['payment_type'] == pagamento_selecionado]
-    
-    if reviews_selecionadas:
-        df_tabela = df_tabela[df_tabela['review_score'].isin(reviews_selecionadas)]
-    
-    if not df_tabela.empty:
-        st.write(f"**Total de registros filtrados:** {len(df_tabela):,}")
+    if total_filtrado:
+        st.write(f"**Total de registros filtrados:** {total_filtrado:,}")
         
-        st.dataframe(
-            df_tabela,
-            use_container_width=True,
-            height=400
-        )
+        col_ordem, col_direcao, col_tamanho, col_pagina = st.columns([2, 1, 1, 1])
         
-        @st.cache_data
-        def converter_df_para_csv(df):
-            return df.to_csv(index=False).encode('utf-8')
+        with col_ordem:
+            coluna_ordem = st.selectbox(
+                'Ordenar por:',
+                ['(ordem original)'] + [coluna for coluna in tabela_final.columns if coluna not in dados.COLUNAS_INTERNAS],
+                key='tabela_ordem'
+            )
         
-        csv_tabela = converter_df_para_csv(df_tabela)
+        with col_direcao:
+            direcao = st.segmented_control(
+                'Direção:',
+                ['Crescente', 'Decrescente'],
+                default='Crescente',
+                key='tabela_direcao'
+            )
         
-        nome_arquivo = f"dados_filtrados_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        with col_tamanho:
+            tamanho_pagina = st.selectbox(
+                'Linhas por página:',
+                paginacao.TAMANHOS_PAGINA,
+                index=1,
+                key='tabela_tamanho'
+            )
         
-        st.download_button(
-            label="📥 **Baixar Tabela como CSV**",
-            data=csv_tabela,
-            file_name=nome_arquivo,
-            mime="text/csv",
-            key='download_tabela_filtrada'
-        )
+        total_paginas = paginacao.total_paginas(total_filtrado, tamanho_pagina)
+        if st.session_state.get('tabela_pagina', 1) > total_paginas:
+            st.session_state['tabela_pagina'] = total_paginas
+        
+        with col_pagina:
+            pagina = st.number_input(
+                'Página:',
+                min_value=1,
+                max_value=total_paginas,
+                step=1,
+                key='tabela_pagina'
+            )
+        
+        with medidor.etapa('tabela', cache=coluna_ordem in tabela_final.columns) as etapa:
+            if coluna_ordem in tabela_final.columns:
+                ordem = ordem_linhas_compartilhada(
+                    tabela_final,
+                    dados_olist.versao,
+                    grao,
+                    coluna_ordem,
+                    direcao != 'Decrescente'
+                )
+            else:
+                ordem = None
+            
+            posicoes_pagina = paginacao.posicoes_da_pagina(
+                indice_filtros.total,
+                posicoes_filtradas,
+                ordem,
+                pagina,
+                tamanho_pagina
+            )
+            
+            st.dataframe(
+                dados.para_exibicao(tabela_final.take(posicoes_pagina)),
+                width="stretch",
+                height=400
+            )
+            etapa['linhas'] = len(posicoes_pagina)
+        st.caption(f"Página {pagina:,} de {total_paginas:,}")
+        
+        col_formato, col_download = st.columns([1, 3], vertical_alignment="bottom")
+        
+        with col_formato:
+            formato_exportacao = st.segmented_control(
+                'Formato:',
+                list(exportacao.FORMATOS),
+                default='CSV',
+                key='formato_exportacao'
+            ) or 'CSV'
+        
+        extensao, mime = exportacao.FORMATOS[formato_exportacao]
+        nome_arquivo = f"dados_filtrados_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.{extensao}"
+        
+        with col_download:
+            st.download_button(
+                label=f"📥 **Baixar Tabela como {formato_exportacao}**",
+                data=lambda: exportacao.gerar_exportacao(tabela_final, posicoes_filtradas, formato_exportacao),
+                file_name=nome_arquivo,
+                mime=mime,
+                key='download_tabela_filtrada'
+            )
         
     else:
         st.info("Nenhum dado encontrado com os filtros selecionados.")
 
 with aba_visualizacao:
-    filtrado = tabela_final.copy()
-    
-    if categorias_selecionadas:
-        filtrado = filtrado[filtrado['product_category_name'].isin(categorias_selecionadas)]
-    
-    if pagamento_selecionado:
-        filtrado = filtrado[filtrado['payment_type'] == pagamento_selecionado]
-    
-    if reviews_selecionadas:
-        filtrado = filtrado[filtrado['review_score'].isin(reviews_selecionadas)]
-    
-    if filtrado.empty:
+    if total_filtrado == 0:
         st.warning("⚠️ Nenhum dado encontrado com os filtros selecionados.")
-        st.stop()
     
-    if not (checkbox_cat or checkbox_pag or checkbox_rev):
-        metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
-        
-        with metric_col1:
-            total_pedidos = len(filtrado['order_id'].unique())
-            st.metric("Total de Pedidos", f"{total_pedidos:,}")
-        
-        with metric_col2:
-            total_clientes = len(filtrado['customer_unique_id'].unique())
-            st.metric("Total de Clientes", f"{total_clientes:,}")
-        
-        with metric_col3:
-            categorias_unicas = len(filtrado['product_category_name'].unique())
-            st.metric("Categorias Únicas", f"{categorias_unicas:,}")
-        
-        with metric_col4:
-            media_review = filtrado['review_score'].mean()
-            st.metric("Média de Avaliações", f"{media_review:.2f}")
-    
-    elif checkbox_cat and not checkbox_pag and not checkbox_rev:
-        col1, col2, col3, col4, col5 = st.columns(5)
-        
-        with col1:
-            total_pedidos_cat = len(filtrado['order_id'].unique())
-            st.metric("Total de Pedidos", f"{total_pedidos_cat:,}")
-        
-        with col2:
-            media_valor_produto = filtrado['price'].mean()
-            st.metric("Valor Médio Produto", f"R${media_valor_produto:.2f}")
-        
-        with col3:
-            pagamento_mais_usado = filtrado['payment_type'].value_counts().index[0]
-            traducao_pagamento = {
-                'boleto': 'Boleto',
-                'credit_card': 'Credito',
-                'debit_card': 'Debito',
-                'voucher': 'Voucher'
-            }
-            pagamento_traduzido = traducao_pagamento.get(pagamento_mais_usado, pagamento_mais_usado)
-            st.metric("Pagamento Mais Usado", pagamento_traduzido)
-        
-        with col4:
-            media_avaliacoes = filtrado['review_score'].mean()
-            st.metric("Média Avaliações", f"{media_avaliacoes:.2f}")
-        
-    elif checkbox_pag and not checkbox_cat and not checkbox_rev:
-        col1, col2, col3, col4 = st.columns([1, 1, 1.5, 1])
-        
-        with col1:
-            total_pagamentos = len(filtrado)
-            st.metric("Total de Pagamentos", f"{total_pagamentos:,}")
-        
-        with col2:
-            media_valor_pagamento = filtrado['payment_value'].mean()
-            st.metric("Valor Médio", f"R${media_valor_pagamento:.2f}")
-        
-        with col3:
-            categoria_mais_pagou = filtrado['product_category_name'].value_counts().index[0]
-            st.metric("Categoria Mais Frequente", categoria_mais_pagou)
+    else:
+        combinacao = (checkbox_cat, checkbox_pag, checkbox_rev)
+        with medidor.etapa('kpi'):
+            colunas_metricas, metricas = painel.indicadores(cubo_olap, fatia, combinacao, contagem_aproximada)
         
-        with col4:
-            media_avaliacoes_pag = filtrado['review_score'].mean()
-            st.metric("Média Avaliações", f"{media_avaliacoes_pag:.2f}")
+        for coluna, metrica in zip(st.columns(colunas_metricas), metricas):
+            with coluna:
+                st.metric(metrica.rotulo, metrica.valor, help=metrica.ajuda)
 
-    elif checkbox_rev and not checkbox_cat and not checkbox_pag:
-        col1, col2, col3 = st.columns([1, 1.5, 1])
-        
-        with col1:
-            total_avaliacoes = len(filtrado)
-            st.metric("Total de Avaliações", f"{total_avaliacoes:,}")
-        
-        with col2:
-            categoria_mais_avaliada = filtrado['product_category_name'].value_counts().index[0]
-            st.metric("Categoria Mais Avaliada", categoria_mais_avaliada)
-        
-        with col3:
-            valor_medio_review = filtrado['price'].mean()
-            st.metric("Valor Médio Produto", f"R${valor_medio_review:.2f}")
+        st.markdown("---")
+        st.subheader("📊 Gráficos")
 
-    elif checkbox_cat and checkbox_pag and not checkbox_rev:
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            total_pedidos_combinado = len(filtrado['order_id'].unique())
-            st.metric("Total de Pedidos", f"{total_pedidos_combinado:,}")
-        
-        with col2:
-            media_valor_combinado = filtrado['price'].mean()
-            st.metric("Valor Médio Produto", f"R${media_valor_combinado:.2f}")
-        
-        with col3:
-            media_review_combinado = filtrado['review_score'].mean()
-            st.metric("Média das Reviews", f"{media_review_combinado:.2f}")
+        with st.container():
+            
+            base_graficos = base_graficos_compartilhada(cubo_olap, dados_olist.versao, grao)
+            dados_grafico = painel.grafico(base_graficos, fatia, combinacao, categorias_selecionadas)
+            
+            if dados_grafico is not None:
+                desenhar, serie_grafico = dados_grafico
+                if graficos_interativos:
+                    with medidor.etapa('grafico', cache=True):
+                        especificacao = vega.especificacao(desenhar, serie_grafico)
+                    st.vega_lite_chart(especificacao, width="stretch")
+                else:
+                    with medidor.etapa('grafico', cache=True):
+                        imagem = graficos.renderizar(desenhar, serie_grafico)
+                    st.image(imagem, width="stretch")
+                
+            elif checkbox_cat and checkbox_pag and checkbox_rev:
+     
+                st.info("Para visualizar gráficos específicos, selecione apenas 1 ou 2 opções de filtro.")
 
-    elif checkbox_cat and checkbox_rev and not checkbox_pag:
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            total_pedidos_cat_rev = len(filtrado['order_id'].unique())
-            st.metric("Total de Pedidos", f"{total_pedidos_cat_rev:,}")
-        
-        with col2:
-            media_valor_cat_rev = filtrado['price'].mean()
-            st.metric("Valor Médio Produto", f"R${media_valor_cat_rev:.2f}")
-        
-        with col3:
-            pagamento_mais_comum = filtrado['payment_type'].value_counts().index[0]
-            traducao_pagamento = {
-                'boleto': 'Boleto',
-                'credit_card': 'Credito',
-                'debit_card': 'Debito',
-                'voucher': 'Voucher'
-            }
-            pagamento_traduzido = traducao_pagamento.get(pagamento_mais_comum, pagamento_mais_comum)
-            st.metric("Pagamento Mais Usado", pagamento_traduzido)
+        if not (checkbox_cat or checkbox_pag or checkbox_rev):
+            st.info("Ative pelo menos um filtro para visualizar os gráficos analíticos.")
 
-    elif checkbox_pag and checkbox_rev and not checkbox_cat:
-        col1, col2, col3 = st.columns([1, 1, 1.5])
-        
-        with col1:
-            total_pedidos_pag_rev = len(filtrado['order_id'].unique())
-            st.metric("Total de Pedidos", f"{total_pedidos_pag_rev:,}")
-        
-        with col2:
-            media_valor_pag_rev = filtrado['price'].mean()
-            st.metric("Valor Médio Produto", f"R${media_valor_pag_rev:.2f}")
+with aba_temporal:
+    limites_datas = temporal.intervalo(dados_olist.rollups)
+    
+    if limites_datas is None:
+        st.info("Nenhuma data de compra disponível no dataset.")
+    
+    else:
+        col_granularidade, col_periodo, col_atraso = st.columns([1, 2, 1], vertical_alignment="bottom")
+        
+        with col_granularidade:
+            granularidade = st.segmented_control(
+                'Granularidade:',
+                list(temporal.GRANULARIDADES),
+                default='Mensal',
+                key='serie_granularidade'
+            ) or 'Mensal'
+        
+        with col_periodo:
+            periodo = st.date_input(
+                'Período:',
+                value=limites_datas,
+                min_value=limites_datas[0],
+                max_value=limites_datas[1],
+                key='serie_periodo'
+            )
         
-        with col3:
-            categoria_mais_comum = filtrado['product_category_name'].value_counts().index[0]
-            st.metric("Categoria Mais Comum", categoria_mais_comum)
-
-    elif checkbox_cat and checkbox_pag and checkbox_rev:
-        col1, col2 = st.columns(2)
+        with col_atraso:
+            mostrar_atraso = st.checkbox("🚚 Atraso de entrega", value=False, key='serie_atraso')
+        
+        data_inicio = periodo[0] if periodo else limites_datas[0]
+        data_fim = periodo[1] if len(periodo) > 1 else limites_datas[1]
+        
+        with medidor.etapa('serie') as etapa:
+            serie_temporal = temporal.serie(
+                dados_olist.rollups,
+                temporal.GRANULARIDADES[granularidade],
+                categorias_selecionadas,
+                pagamento_selecionado,
+                reviews_selecionadas,
+                data_inicio,
+                data_fim
+            )
+            etapa['linhas'] = len(serie_temporal)
         
-        with col1:
-            total_pedidos_completo = len(filtrado['order_id'].unique())
-            st.metric("Total de Pedidos", f"{total_pedidos_completo:,}")
+        if serie_temporal.empty:
+            st.warning("⚠️ Nenhum pedido no período com os filtros selecionados.")
         
-        with col2:
-            media_valor_completo = filtrado['price'].mean()
-            st.metric("Valor Médio Produto", f"R${media_valor_completo:.2f}")
-
-    st.markdown("---")
-    st.subheader("📊 Gráficos")
+        else:
+            col_receita, col_pedidos = st.columns(2, gap="large")
+            with col_receita:
+                st.markdown("**💰 Receita (R$)**")
+                st.line_chart(serie_temporal, y='Receita', height=280)
+            with col_pedidos:
+                st.markdown("**📦 Pedidos**")
+                st.line_chart(serie_temporal, y='Pedidos', height=280)
+            
+            col_review, col_entrega = st.columns(2, gap="large")
+            with col_review:
+                st.markdown("**⭐ Avaliação Média**")
+                st.line_chart(serie_temporal, y='Avaliação média', height=280)
+            if mostrar_atraso:
+                with col_entrega:
+                    st.markdown("**🚚 Atraso Médio da Entrega (dias, negativo = antes do previsto)**")
+                    st.line_chart(serie_temporal, y='Atraso médio (dias)', height=280)
 
-    with st.container():
-        
-        if checkbox_cat and not checkbox_pag and not checkbox_rev:
-            
-            if categorias_selecionadas:
-                dados_grafico = filtrado['product_category_name'].value_counts()
-            else:
-                dados_grafico = tabela_final['product_category_name'].value_counts().head(15)
-            
-            fig, ax = plt.subplots(figsize=(10, 8))
-            
-            bars = ax.bar(range(len(dados_grafico)), dados_grafico.values, color='#219ebc')
-            ax.set_xlabel('Categorias de Produtos', fontsize=12)
-            ax.set_ylabel('Quantidade de Vendas', fontsize=12)
-            ax.set_title('Distribuição por Categoria de Produto', fontsize=14)
-            ax.set_xticks(range(len(dados_grafico)))
-            ax.set_xticklabels(dados_grafico.index, rotation=45, ha='right', fontsize=10)
-            
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{int(height):,}', ha='center', va='bottom', fontsize=9)
-            
-            plt.tight_layout()
-            st.pyplot(fig)
-        
-        elif checkbox_pag and not checkbox_cat and not checkbox_rev:
-            
-            dados_pagamento = tabela_final['payment_type'].value_counts()
-            
-            traducao_pagamento = {
-                'boleto': 'Boleto',
-                'credit_card': 'Crédito',
-                'debit_card': 'Débito',
-                'voucher': 'Voucher'
-            }
-            labels = [traducao_pagamento.get(x, x) for x in dados_pagamento.index]
-            
-            fig, ax = plt.subplots(figsize=(10, 8))
-            
-            colors = ['#8ecae6', '#219ebc', '#023047', '#ffb703']
-            wedges, texts, autotexts = ax.pie(dados_pagamento.values, labels=labels, autopct='%1.1f%%',
-                                            startangle=90, colors=colors)
-            ax.axis('equal')
-            ax.set_title('Distribuição por Tipo de Pagamento', fontsize=14, pad=20)
-            
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontweight('bold')
-            
-            plt.tight_layout()
-            st.pyplot(fig)
-        
-        elif checkbox_rev and not checkbox_cat and not checkbox_pag:
-            
-            dados_review = tabela_final['review_score'].value_counts().sort_index()
-            
-            fig, ax = plt.subplots(figsize=(10, 8))
-            
-            colors = ['#8ecae6', '#219ebc', '#023047', '#ffb703', '#fb8500']
-            wedges, texts, autotexts = ax.pie(dados_review.values, labels=[f'Nota {i}' for i in dados_review.index],
-                                            autopct='%1.1f%%', startangle=90, colors=colors)
-            ax.axis('equal')
-            ax.set_title('Distribuição por Nota de Avaliação', fontsize=14, pad=20)
-            
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontweight('bold')
-            
-            plt.tight_layout()
-            st.pyplot(fig)
-        
-        elif checkbox_cat and checkbox_pag and not checkbox_rev:
-            if categorias_selecionadas:
-                dados_grafico = filtrado
-            else:
-                top_categorias = tabela_final['product_category_name'].value_counts().head(10).index
-                dados_grafico = tabela_final[tabela_final['product_category_name'].isin(top_categorias)]
-            
-            tabela_cruzada = pd.crosstab(dados_grafico['product_category_name'], 
-                                        dados_grafico['payment_type'])
-            
-            tabela_cruzada['total'] = tabela_cruzada.sum(axis=1)
-            tabela_cruzada = tabela_cruzada.sort_values('total', ascending=False).drop('total', axis=1)
-            
-            traducao_pagamento = {
-                'boleto': 'Boleto',
-                'credit_card': 'Crédito',
-                'debit_card': 'Débito',
-                'voucher': 'Voucher'
-            }
-            tabela_cruzada.columns = [traducao_pagamento.get(x, x) for x in tabela_cruzada.columns]
-            
-            fig, ax = plt.subplots(figsize=(10, 8))
-            
-            bottom = np.zeros(len(tabela_cruzada))
-            colors = ['#8ecae6', '#219ebc', '#023047', '#ffb703']
-            
-            for i, pagamento in enumerate(tabela_cruzada.columns):
-                valores = tabela_cruzada[pagamento].values
-                ax.bar(tabela_cruzada.index, valores, bottom=bottom, 
-                      label=pagamento, color=colors[i % len(colors)], alpha=0.8)
-                
-                for j, val in enumerate(valores):
-                    if val > 0: 
-                        x_pos = j
-                        y_pos = bottom[j] + val/2
-                        ax.text(x_pos, y_pos, f'{int(val):,}', 
-                               ha='center', va='center', 
-                               color='black', fontsize=8, fontweight='bold')
-                
-                bottom += valores
-            
-            ax.set_xlabel('Categorias de Produtos', fontsize=12)
-            ax.set_ylabel('Quantidade', fontsize=12)
-            ax.set_title('Distribuição de Pagamentos por Categoria', fontsize=14)
-            ax.set_xticks(range(len(tabela_cruzada)))
-            ax.set_xticklabels(tabela_cruzada.index, rotation=45, ha='right', fontsize=10)
-            ax.legend(title='Tipo de Pagamento', bbox_to_anchor=(1.05, 1), loc='upper left')
-            
-            plt.tight_layout()
-            st.pyplot(fig)
-        
-        elif checkbox_cat and checkbox_rev and not checkbox_pag:
-            
-            if categorias_selecionadas:
-                dados_cat_rev = filtrado
+with aba_regioes:
+    with medidor.etapa('regioes') as etapa:
+        estados = geografia.por_estado(
+            dados_olist.regioes,
+            categorias_selecionadas,
+            pagamento_selecionado,
+            reviews_selecionadas
+        )
+        etapa['linhas'] = len(estados)
+    
+    if estados.empty:
+        st.warning("⚠️ Nenhum dado encontrado com os filtros selecionados.")
+    
+    else:
+        metrica_regiao = st.segmented_control(
+            'Métrica:',
+            ['Pedidos', 'Receita', 'Avaliação média'],
+            default='Pedidos',
+            key='regiao_metrica'
+        ) or 'Pedidos'
+        
+        colunas_regiao = {
+            'Receita': st.column_config.NumberColumn('Receita', format="R$%.2f"),
+            'Pedidos': st.column_config.NumberColumn('Pedidos', format="%d"),
+            'Avaliação média': st.column_config.NumberColumn('Avaliação média', format="%.2f"),
+            'Atraso médio (dias)': st.column_config.NumberColumn('Atraso médio (dias)', format="%.1f"),
+            'lat': None,
+            'lon': None,
+        }
+        
+        col_mapa, col_estados = st.columns([3, 2], gap="large")
+        
+        with col_mapa:
+            localizados = estados.dropna(subset=['lat', 'lon'])
+            if localizados.empty:
+                st.bar_chart(estados, y=metrica_regiao, horizontal=True, height=500)
             else:
-                top_categorias = tabela_final['product_category_name'].value_counts().head(5).index
-                dados_cat_rev = tabela_final[tabela_final['product_category_name'].isin(top_categorias)]
-            
-            tabela_cruzada = pd.crosstab(dados_cat_rev['product_category_name'], 
-                                        dados_cat_rev['review_score'])
-            
-            tabela_cruzada['total'] = tabela_cruzada.sum(axis=1)
-            tabela_cruzada = tabela_cruzada.sort_values('total', ascending=False).drop('total', axis=1)
-            
-            fig, ax = plt.subplots(figsize=(10, 8))
-            
-            bottom = np.zeros(len(tabela_cruzada))
-            colors = ['#8ecae6', '#219ebc', '#023047', '#ffb703', '#fb8500']
-            
-            for i, review in enumerate(sorted(tabela_cruzada.columns)):
-                valores = tabela_cruzada[review].values
-                ax.bar(tabela_cruzada.index, valores, bottom=bottom, 
-                      label=f'Nota {review}', color=colors[i % len(colors)], alpha=0.8)
-                
-               
-                for j, val in enumerate(valores):
-                    if val > 0:  
-                        x_pos = j
-                        y_pos = bottom[j] + val/2
-                        ax.text(x_pos, y_pos, f'{int(val):,}', 
-                               ha='center', va='center', 
-                               color='black', fontsize=8, fontweight='bold')
-                
-                bottom += valores
-            
-            ax.set_xlabel('Categorias de Produtos', fontsize=12)
-            ax.set_ylabel('Quantidade', fontsize=12)
-            ax.set_title('Distribuição de Avaliações por Categoria', fontsize=14)
-            ax.set_xticks(range(len(tabela_cruzada)))
-            ax.set_xticklabels(tabela_cruzada.index, rotation=45, ha='right', fontsize=10)
-            ax.legend(title='Nota', bbox_to_anchor=(1.05, 1), loc='upper left')
-            
-            plt.tight_layout()
-            st.pyplot(fig)
-
-        elif checkbox_pag and checkbox_rev and not checkbox_cat:
-            tabela_cruzada = pd.crosstab(tabela_final['payment_type'], 
-                                        tabela_final['review_score'])
-            
-            traducao_pagamento = {
-                'boleto': 'Boleto',
-                'credit_card': 'Crédito',
-                'debit_card': 'Débito',
-                'voucher': 'Voucher'
-            }
-            tabela_cruzada.index = [traducao_pagamento.get(x, x) for x in tabela_cruzada.index]
-            
-            fig, ax = plt.subplots(figsize=(10, 8))
-            
-            tabela_normalizada = tabela_cruzada.div(tabela_cruzada.sum(axis=1), axis=0)          
+                valores = localizados[metrica_regiao]
+                st.map(
+                    localizados.assign(tamanho=20_000 + 180_000 * valores / valores.max()),
+                    latitude='lat',
+                    longitude='lon',
+                    size='tamanho',
+                    height=500
+                )
+        
+        with col_estados:
+            st.dataframe(
+                estados.sort_values(metrica_regiao, ascending=False, kind='stable'),
+                column_config=colunas_regiao,
+                height=500,
+                width="stretch"
+            )
         
-            from matplotlib.colors import LinearSegmentedColormap
-            
-            coolors_colors = ['#8ecae6', '#219ebc', '#023047', '#ffb703', '#fb8500']
+        estado_selecionado = st.selectbox(
+            'Cidades do estado:',
+            estados.index.tolist(),
+            key='regiao_estado'
+        )
+        with medidor.etapa('cidades') as etapa:
+            cidades = geografia.por_cidade(
+                dados_olist.regioes,
+                estado_selecionado,
+                categorias_selecionadas,
+                pagamento_selecionado,
+                reviews_selecionadas
+            )
+            etapa['linhas'] = len(cidades)
+        st.dataframe(cidades, column_config=colunas_regiao, width="stretch")
 
-            custom_cmap = LinearSegmentedColormap.from_list('coolors_cmap', coolors_colors)
-            
-            sns.heatmap(tabela_normalizada, annot=True, fmt=".2%", cmap=custom_cmap, 
-                       cbar_kws={'label': 'Proporção'}, ax=ax,
-                       linewidths=0.5, linecolor='black')
-            
-            ax.set_xlabel('Nota de Avaliação', fontsize=12)
-            ax.set_ylabel('Tipo de Pagamento', fontsize=12)
-            ax.set_title('Proporção de Avaliações por Tipo de Pagamento', fontsize=14)
-            
-            plt.tight_layout()
-            st.pyplot(fig)
-            
-        elif checkbox_cat and checkbox_pag and checkbox_rev:
- 
-            st.info("Para visualizar gráficos específicos, selecione apenas 1 ou 2 opções de filtro.")
+with aba_clientes:
+    with medidor.etapa('clientes', cache=True) as etapa:
+        perfil_clientes = perfis_clientes_compartilhados(
+            dados_olist.clientes,
+            dados_olist.versao,
+            grao,
+            tuple(sorted(categorias_selecionadas)),
+            pagamento_selecionado,
+            tuple(sorted(reviews_selecionadas))
+        )
+        etapa['linhas'] = len(perfil_clientes)
+    
+    indicadores_clientes = clientes.indicadores(perfil_clientes)
+    
+    if indicadores_clientes is None:
+        st.warning("⚠️ Nenhum cliente encontrado com os filtros selecionados.")
+    
+    else:
+        col_total, col_recompra, col_ltv, col_frequencia = st.columns(4)
+        col_total.metric("👥 Clientes", f"{indicadores_clientes['clientes']:,}")
+        col_recompra.metric(
+            "🔁 Taxa de Recompra",
+            f"{indicadores_clientes['recompra']:.1%}",
+            help="Clientes com mais de um pedido"
+        )
+        col_ltv.metric(
+            "💎 LTV Médio",
+            f"R${indicadores_clientes['ltv']:,.2f}",
+            help="Receita acumulada por cliente no histórico"
+        )
+        col_frequencia.metric("📦 Pedidos por Cliente", f"{indicadores_clientes['pedidos']:.2f}")
+        
+        colunas_clientes = {
+            'Receita': st.column_config.NumberColumn('Receita', format="R$%.2f"),
+            'LTV médio': st.column_config.NumberColumn('LTV médio', format="R$%.2f"),
+            'Ticket médio': st.column_config.NumberColumn('Ticket médio', format="R$%.2f"),
+            '% dos clientes': st.column_config.NumberColumn('% dos clientes', format="percent"),
+            'Pedidos médios': st.column_config.NumberColumn('Pedidos médios', format="%.2f"),
+            'Recência (dias)': st.column_config.NumberColumn('Recência (dias)', format="%d"),
+            'Recência média (dias)': st.column_config.NumberColumn('Recência média (dias)', format="%.0f"),
+            'Avaliação média': st.column_config.NumberColumn('Avaliação média', format="%.2f"),
+            'Primeira compra': st.column_config.DateColumn('Primeira compra'),
+            'Última compra': st.column_config.DateColumn('Última compra'),
+        }
+        
+        st.markdown("**🎯 Segmentos RFM (recência, frequência e valor)**")
+        segmentos = clientes.resumo_segmentos(perfil_clientes)
+        col_segmentos, col_distribuicao = st.columns([3, 2], gap="large")
+        with col_segmentos:
+            st.dataframe(segmentos, column_config=colunas_clientes, width="stretch")
+        with col_distribuicao:
+            st.bar_chart(segmentos, y='Clientes', horizontal=True, height=380)
+        
+        segmento_selecionado = st.selectbox(
+            'Clientes do segmento:',
+            segmentos.index.tolist(),
+            key='clientes_segmento'
+        )
+        with medidor.etapa('segmento') as etapa:
+            clientes_segmento = clientes.por_segmento(perfil_clientes, segmento_selecionado)
+            etapa['linhas'] = len(clientes_segmento)
+        st.dataframe(clientes_segmento, column_config=colunas_clientes, width="stretch")
 
-    if not (checkbox_cat or checkbox_pag or checkbox_rev):
-        st.info("Ative pelo menos um filtro para visualizar os gráficos analíticos.")
+if medidor.ativo:
+    with st.expander("⏱️ Instrumentação desta execução", expanded=False):
+        st.dataframe(
+            medidor.tabela(),
+            hide_index=True,
+            column_config={
+                'etapa': 'Etapa',
+                'duracao_ms': st.column_config.NumberColumn('Duração (ms)', format="%.2f"),
+                'linhas': st.column_config.NumberColumn('Linhas', format="%d"),
+                'cache': 'Cache',
+                'rss_mb': st.column_config.NumberColumn('RSS (MB)', format="%.1f"),
+            }
+        )
+        st.caption(
+            "Carga do dataset (uma vez por processo): " +
+            " · ".join(f"{nome} {duracao:.2f}s" for nome, duracao in dados_olist.tempos.items())
+        )
+        st.caption(f"Tempo total da execução: {medidor.total_ms():.1f} ms")
+    medidor.emitir_log(
+        filtros={
+            'categorias': categorias_selecionadas,
+            'pagamento': pagamento_selecionado,
+            'reviews': reviews_selecionadas,
+        },
+        carga=dados_olist.tempos
+    )
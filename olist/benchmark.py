@@ -0,0 +1,385 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import clientes, cubo, dados, geografia, graficos, indice, paginacao, painel, sintetico, temporal, vega
+from .instrumentacao import rss_atual_mb
+
+
+def _rss_pico_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ru_maxrss só cresce; no Linux o pico (VmHWM) pode ser zerado via clear_refs para medir cada etapa.
+def _reiniciar_pico_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as arquivo:
+            arquivo.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _pico_rss_desde_reinicio_mb():
+    try:
+        with open('/proc/self/status') as arquivo:
+            for linha in arquivo:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _cronometrar(funcao, repeticoes=1):
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, statistics.median(tempos)
+
+
+def _selecoes(indice_filtros, combinacao):
+    checkbox_cat, checkbox_pag, checkbox_rev = combinacao
+    por_tamanho = lambda mapa: sorted(mapa, key=lambda valor: len(mapa[valor]), reverse=True)
+
+    categorias = por_tamanho(indice_filtros.categorias)[:3] if checkbox_cat else []
+    pagamento = por_tamanho(indice_filtros.pagamentos)[0] if checkbox_pag else None
+    reviews = [nota for nota in (4, 5) if nota in indice_filtros.reviews] if checkbox_rev else []
+    return categorias, pagamento, reviews
+
+
+def medir_combinacao(tabela_final, indice_filtros, cubo_olap, rollups, clientes_olist, base, combinacao, repeticoes=3):
+    categorias, pagamento, reviews = _selecoes(indice_filtros, combinacao)
+    pico_reiniciado = _reiniciar_pico_rss()
+    rss_inicial = rss_atual_mb()
+
+    def filtrar():
+        posicoes = indice.filtrar_posicoes(indice_filtros, categorias, pagamento, reviews)
+        return posicoes, cubo.fatiar(cubo_olap, categorias, pagamento, reviews)
+
+    (posicoes, fatia), tempo_filtro = _cronometrar(filtrar, repeticoes)
+
+    def montar_pagina():
+        pagina = paginacao.posicoes_da_pagina(indice_filtros.total, posicoes, None, 1, paginacao.TAMANHOS_PAGINA[1])
+        return dados.para_exibicao(tabela_final.take(pagina))
+
+    _, tempo_tabela = _cronometrar(montar_pagina, repeticoes)
+    _, tempo_kpi = _cronometrar(lambda: painel.indicadores(cubo_olap, fatia, combinacao), repeticoes)
+
+    def desenhar_grafico():
+        grafico = painel.grafico(base, fatia, combinacao, categorias)
+        if grafico is None:
+            return None
+        desenhar, serie = grafico
+        return graficos.renderizar(desenhar, serie, usar_cache=False)
+
+    png, tempo_grafico = _cronometrar(desenhar_grafico, repeticoes)
+
+    def especificar_grafico():
+        grafico = painel.grafico(base, fatia, combinacao, categorias)
+        if grafico is None:
+            return None
+        desenhar, serie = grafico
+        return vega.especificacao(desenhar, serie, usar_cache=False)
+
+    _, tempo_vega = _cronometrar(especificar_grafico, repeticoes)
+    _, tempo_serie = _cronometrar(lambda: temporal.serie(rollups, 'M', categorias, pagamento, reviews), repeticoes)
+    _, tempo_clientes = _cronometrar(
+        lambda: clientes.perfis(clientes_olist, categorias, pagamento, reviews), repeticoes
+    )
+
+    return {
+        'combinacao': painel.nome_combinacao(combinacao),
+        'linhas_filtradas': indice_filtros.total if posicoes is None else len(posicoes),
+        'tempos': {
+            'filtro': tempo_filtro,
+            'tabela': tempo_tabela,
+            'kpi': tempo_kpi,
+            'grafico': tempo_grafico if png is not None else None,
+            'grafico_vega': tempo_vega if png is not None else None,
+            'serie': tempo_serie,
+            'clientes': tempo_clientes,
+        },
+        'rss_mb': _rss_da_combinacao(rss_inicial, pico_reiniciado),
+    }
+
+
+def _rss_da_combinacao(rss_inicial, pico_reiniciado):
+    pico = _pico_rss_desde_reinicio_mb() if pico_reiniciado else None
+    final = rss_atual_mb()
+    pico = max(pico or 0, rss_inicial, final)
+    return {
+        'inicial': rss_inicial,
+        'final': final,
+        'pico': pico,
+        'pico_exato': pico_reiniciado,
+        'adicional': pico - rss_inicial,
+    }
+
+
+def medir_escala(escala, pedidos_base=sintetico.PEDIDOS_OLIST, repeticoes=3, semente=0):
+    with tempfile.TemporaryDirectory() as pasta:
+        _, tempo_geracao = _cronometrar(lambda: sintetico.gerar_dataset(pasta, escala, semente, pedidos_base))
+        rss_base = _rss_pico_mb()
+
+        tabelas, tempo_ingestao = _cronometrar(lambda: dados.ler_arquivos(pasta))
+        tabela_final, tempo_merge = _cronometrar(lambda: dados.montar_tabela_final(tabelas))
+        itens = tabelas['itens']
+        del tabelas
+        indice_filtros, tempo_indice = _cronometrar(lambda: indice.construir_indice(tabela_final))
+        cubo_olap, tempo_cubo = _cronometrar(lambda: cubo.construir_cubo(tabela_final))
+        rollups, tempo_rollups = _cronometrar(lambda: temporal.construir_rollups(tabela_final))
+        clientes_olist, tempo_clientes = _cronometrar(lambda: clientes.construir_clientes(tabela_final))
+        regioes, tempo_regioes = _cronometrar(lambda: geografia.construir_regioes(tabela_final))
+        base, tempo_base = _cronometrar(lambda: painel.base_graficos(cubo_olap))
+        rss_carga = _rss_pico_mb()
+        conferencia = conferir_receita(tabela_final, itens, rollups, regioes, clientes_olist)
+        del itens
+        atualizacao = conferir_atualizacao(pasta)
+
+        combinacoes = [
+            medir_combinacao(tabela_final, indice_filtros, cubo_olap, rollups, clientes_olist, base, combinacao, repeticoes)
+            for combinacao in painel.COMBINACOES
+        ]
+
+    return {
+        'escala': escala,
+        'pedidos': pedidos_base * escala,
+        'linhas': len(tabela_final),
+        'tempos': {
+            'geracao': tempo_geracao,
+            'ingestao': tempo_ingestao,
+            'merge': tempo_merge,
+            'indice': tempo_indice,
+            'cubo': tempo_cubo,
+            'rollups': tempo_rollups,
+            'clientes': tempo_clientes,
+            'regioes': tempo_regioes,
+            'base_graficos': tempo_base,
+        },
+        'rss_pico_mb': {
+            'geracao': rss_base,
+            'carga': rss_carga,
+        },
+        'conferencia': conferencia,
+        'atualizacao': atualizacao,
+        'combinacoes': combinacoes,
+    }
+
+
+def _receita_dos_itens(tabela_final, itens):
+    pedidos = tabela_final[['order_id', 'customer_state', 'customer_unique_id']].drop_duplicates('order_id')
+    pedidos = pedidos.assign(
+        order_id=pedidos['order_id'].astype('str'),
+        customer_unique_id=pedidos['customer_unique_id'].astype('str'),
+    )
+    return itens.assign(price=itens['price'].astype('float64')).merge(pedidos, on='order_id')
+
+
+def _maior_diferenca(obtida, esperada):
+    todos = obtida.index.union(esperada.index)
+    return float(np.abs(
+        obtida.reindex(todos, fill_value=0.0).to_numpy() - esperada.reindex(todos, fill_value=0.0).to_numpy()
+    ).max(initial=0.0))
+
+
+def conferir_receita(tabela_final, itens, rollups, regioes, clientes_olist):
+    incluidos = _receita_dos_itens(tabela_final, itens)
+    esperada = float(incluidos['price'].sum())
+    serie = float(temporal.serie(rollups, 'D')['Receita'].sum())
+
+    divergencia_estados = _maior_diferenca(
+        geografia.por_estado(regioes)['Receita'],
+        incluidos.groupby('customer_state', observed=True)['price'].sum(),
+    )
+    ltv = clientes.perfis(clientes_olist)['Receita']
+    ltv_itens = incluidos.groupby('customer_unique_id')['price'].sum()
+    divergencia_clientes = _maior_diferenca(ltv, ltv_itens)
+    tolerancia = 1e-6 * max(esperada, 1.0)
+
+    return {
+        'receita_itens': esperada,
+        'receita_serie': serie,
+        'divergencia_estados': divergencia_estados,
+        'ltv_medio': float(ltv.mean()),
+        'ltv_medio_itens': float(ltv_itens.reindex(ltv.index, fill_value=0.0).mean()),
+        'divergencia_clientes': divergencia_clientes,
+        'ok': (
+            bool(np.isclose(serie, esperada, rtol=1e-9)) and
+            divergencia_estados <= tolerancia and
+            divergencia_clientes <= tolerancia
+        ),
+    }
+
+
+def _linhas_canonicas(tabela):
+    return np.sort(pd.util.hash_pandas_object(tabela, index=False).to_numpy())
+
+
+def _agregados_iguais(obtido, esperado):
+    obtido, esperado = obtido.sort_index(), esperado.sort_index()
+    numericas = esperado.select_dtypes('number').columns
+    return (
+        obtido.index.equals(esperado.index) and
+        np.allclose(obtido[numericas].to_numpy('float64'), esperado[numericas].to_numpy('float64'),
+                    rtol=1e-9, equal_nan=True) and
+        obtido.drop(columns=numericas).equals(esperado.drop(columns=numericas))
+    )
+
+
+def conferir_atualizacao(pasta, fracao=0.9):
+    # Simula uma nova versão do Kaggle: outra pasta, com pedidos novos e uma avaliação alterada.
+    anterior, atual = os.path.join(pasta, 'versao_1'), os.path.join(pasta, 'versao_2')
+    for destino in (anterior, atual):
+        os.makedirs(destino)
+        for arquivo in os.listdir(pasta):
+            if arquivo.endswith('.csv'):
+                shutil.copy(os.path.join(pasta, arquivo), destino)
+
+    arquivo_pedidos = dados.ARQUIVOS['pedidos'][0]
+    pedidos = pd.read_csv(os.path.join(pasta, arquivo_pedidos))
+    antigos = pedidos.sort_values('order_purchase_timestamp', kind='stable').iloc[:int(len(pedidos) * fracao)]
+    antigos.to_csv(os.path.join(anterior, arquivo_pedidos), index=False)
+
+    arquivo_reviews = dados.ARQUIVOS['reviews'][0]
+    reviews = pd.read_csv(os.path.join(pasta, arquivo_reviews))
+    alterada = reviews.index[reviews['order_id'].isin(antigos['order_id'])][0]
+    reviews.loc[alterada, 'review_score'] = 5 if reviews.loc[alterada, 'review_score'] == 1 else 1
+    reviews.to_csv(os.path.join(atual, arquivo_reviews), index=False)
+
+    chave = os.path.join(pasta, 'origem')
+    carga_anterior = dados.carregar_dados(anterior, chave=chave)
+    do_snapshot, tempo_snapshot = _cronometrar(lambda: dados.carregar_dados(atual, incremental=True, chave=chave))
+    atualizado, tempo_atualizacao = _cronometrar(
+        lambda: dados.atualizar_dados(carga_anterior, atual, usar_snapshot=False)
+    )
+    completo, tempo_completo = _cronometrar(lambda: dados.carregar_dados(atual, usar_snapshot=False))
+
+    esperadas = _linhas_canonicas(completo.tabela_final)
+    filtros = [(None, None, None), (None, 'credit_card', [4, 5])]
+    return {
+        'linhas_anteriores': len(carga_anterior.tabela_final),
+        'linhas': len(completo.tabela_final),
+        'tempos': {
+            'snapshot_desatualizado': tempo_snapshot,
+            'atualizacao': tempo_atualizacao,
+            'carga_completa': tempo_completo,
+        },
+        'ok': (
+            'delta' in do_snapshot.tempos and
+            np.array_equal(_linhas_canonicas(do_snapshot.tabela_final), esperadas) and
+            np.array_equal(_linhas_canonicas(atualizado.tabela_final), esperadas) and
+            all(
+                _agregados_iguais(temporal.serie(atualizado.rollups, 'D', *f), temporal.serie(completo.rollups, 'D', *f)) and
+                _agregados_iguais(geografia.por_estado(atualizado.regioes, *f), geografia.por_estado(completo.regioes, *f)) and
+                _agregados_iguais(clientes.perfis(atualizado.clientes, *f), clientes.perfis(completo.clientes, *f))
+                for f in filtros
+            )
+        ),
+    }
+
+
+def _medir_em_processo_novo(argumentos):
+    contexto = multiprocessing.get_context('spawn')
+    with contexto.Pool(1) as processo:
+        return processo.apply(medir_escala, argumentos)
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(escalas, pedidos_base=sintetico.PEDIDOS_OLIST, repeticoes=3, semente=0):
+    return {
+        'gerado_em': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'commit': _commit_atual(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'pedidos_base': pedidos_base,
+        'repeticoes': repeticoes,
+        'escalas': [
+            _medir_em_processo_novo((escala, pedidos_base, repeticoes, semente))
+            for escala in escalas
+        ],
+    }
+
+
+def _imprimir_resumo(resultado):
+    for medida in resultado['escalas']:
+        tempos = medida['tempos']
+        print(
+            f"{medida['escala']}x ({medida['linhas']:,} linhas): "
+            f"ingestão {tempos['ingestao']:.3f}s · merge {tempos['merge']:.3f}s · "
+            f"índice {tempos['indice']:.3f}s · cubo {tempos['cubo']:.3f}s · rollups {tempos['rollups']:.3f}s · "
+            f"clientes {tempos['clientes']:.3f}s · "
+            f"RSS pico {medida['rss_pico_mb']['carga']:.0f} MB"
+        )
+        conferencia = medida['conferencia']
+        print(
+            f"  receita: série R${conferencia['receita_serie']:,.2f} · itens R${conferencia['receita_itens']:,.2f} · "
+            f"maior diferença por estado R${conferencia['divergencia_estados']:,.2f} · "
+            f"LTV médio R${conferencia['ltv_medio']:,.2f} (itens R${conferencia['ltv_medio_itens']:,.2f}) · "
+            f"{'ok' if conferencia['ok'] else 'DIVERGENTE'}"
+        )
+        atualizacao = medida['atualizacao']
+        print(
+            f"  atualização incremental ({atualizacao['linhas_anteriores']:,} → {atualizacao['linhas']:,} linhas): "
+            f"delta {atualizacao['tempos']['atualizacao']:.3f}s · "
+            f"snapshot desatualizado {atualizacao['tempos']['snapshot_desatualizado']:.3f}s · "
+            f"carga completa {atualizacao['tempos']['carga_completa']:.3f}s · "
+            f"{'ok' if atualizacao['ok'] else 'DIVERGENTE'}"
+        )
+        for combinacao in medida['combinacoes']:
+            tempos = combinacao['tempos']
+            grafico = '-' if tempos['grafico'] is None else (
+                f"{tempos['grafico'] * 1000:.1f}ms (vega {tempos['grafico_vega'] * 1000:.1f}ms)"
+            )
+            print(
+                f"  {combinacao['combinacao']:<26} filtro {tempos['filtro'] * 1000:.2f}ms · "
+                f"tabela {tempos['tabela'] * 1000:.2f}ms · kpi {tempos['kpi'] * 1000:.2f}ms · "
+                f"gráfico {grafico} · série {tempos['serie'] * 1000:.2f}ms · "
+                f"clientes {tempos['clientes'] * 1000:.2f}ms · "
+                f"RSS pico {combinacao['rss_mb']['pico']:.0f} MB (+{combinacao['rss_mb']['adicional']:.0f})"
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark headless do pipeline do dashboard Olist.')
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--pedidos-base', type=int, default=sintetico.PEDIDOS_OLIST)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', default='benchmark.json')
+    argumentos = parser.parse_args()
+
+    resultado = executar(argumentos.escalas, argumentos.pedidos_base, argumentos.repeticoes, argumentos.semente)
+    with open(argumentos.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    _imprimir_resumo(resultado)
+    print(f'Resultados salvos em {argumentos.saida}')
+    if not all(medida['conferencia']['ok'] for medida in resultado['escalas']):
+        sys.exit('Receita das agregações diverge da soma dos itens')
+    if not all(medida['atualizacao']['ok'] for medida in resultado['escalas']):
+        sys.exit('Atualização incremental diverge da carga completa')
@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .cubo import codigos_inteiros
+from .rollup import Rollup, construir_rollup, estender_rollup, mascara_rollup, pedidos_selecionados
+
+
+COLUNA_DATA = 'order_purchase_timestamp'
+
+SEGMENTOS = [
+    'Campeões',
+    'Leais',
+    'Potenciais leais',
+    'Novos',
+    'Promissores',
+    'Precisa de atenção',
+    'Quase dormindo',
+    'Em risco',
+    'Não pode perder',
+    'Hibernando',
+]
+
+# Linhas: nota de recência (1 a 5); colunas: nota de frequência (1 a 5).
+SEGMENTOS_RF = [
+    ['Hibernando', 'Hibernando', 'Em risco', 'Em risco', 'Não pode perder'],
+    ['Hibernando', 'Hibernando', 'Em risco', 'Em risco', 'Não pode perder'],
+    ['Quase dormindo', 'Quase dormindo', 'Precisa de atenção', 'Leais', 'Leais'],
+    ['Promissores', 'Potenciais leais', 'Potenciais leais', 'Leais', 'Leais'],
+    ['Novos', 'Potenciais leais', 'Potenciais leais', 'Campeões', 'Campeões'],
+]
+
+_CODIGOS_RF = np.array([pd.Index(SEGMENTOS).get_indexer(linha) for linha in SEGMENTOS_RF], dtype=np.int8)
+
+
+@dataclass
+class Clientes:
+    rollup: Rollup
+    ids: pd.Index
+    cliente_do_pedido: np.ndarray
+    ordem: np.ndarray
+    referencia: pd.Timestamp
+    perfil: pd.DataFrame
+
+
+def _nota(valores, crescente=True):
+    postos = pd.Series(valores).rank(method='average', pct=True, ascending=crescente).fillna(0).to_numpy()
+    return np.clip(np.ceil(postos * 5), 1, 5).astype(np.int8)
+
+
+def _perfil(clientes, mascara):
+    rollup = clientes.rollup
+    baldes = rollup.baldes
+    selecionados = clientes.ordem[mascara[clientes.ordem]]
+    codigos = baldes['cliente'].to_numpy()[selecionados]
+    inicios = np.flatnonzero(np.diff(codigos, prepend=-1))
+
+    def reduzir(funcao, coluna):
+        valores = baldes[coluna].to_numpy()[selecionados]
+        return funcao.reduceat(valores, inicios) if len(inicios) else valores
+
+    pedidos_do_filtro, _ = pedidos_selecionados(rollup, selecionados)
+    presentes = np.zeros(rollup.total_pedidos, dtype=bool)
+    presentes[pedidos_do_filtro] = True
+    pedidos = np.bincount(clientes.cliente_do_pedido[presentes], minlength=len(clientes.ids))[codigos[inicios]]
+
+    receita = reduzir(np.add, 'soma_receita')
+    ultima = reduzir(np.fmax, 'ultima_compra')
+    recencia = (clientes.referencia.to_datetime64() - ultima) / np.timedelta64(1, 'D')
+    nota_r = _nota(recencia, crescente=False)
+    nota_f = np.clip(pedidos, 1, 5).astype(np.int8)
+    nota_m = _nota(receita)
+
+    return pd.DataFrame({
+        'Pedidos': pedidos,
+        'Receita': receita,
+        'Ticket médio': receita / np.maximum(pedidos, 1),
+        'Primeira compra': reduzir(np.fmin, 'primeira_compra'),
+        'Última compra': ultima,
+        'Recência (dias)': recencia,
+        'Avaliação média': reduzir(np.add, 'soma_review_score') / reduzir(np.add, 'linhas'),
+        'R': nota_r,
+        'F': nota_f,
+        'M': nota_m,
+        'Segmento': pd.Categorical.from_codes(_CODIGOS_RF[nota_r - 1, nota_f - 1], categories=SEGMENTOS),
+    }, index=pd.Index(clientes.ids.take(codigos[inicios]), name='Cliente'))
+
+
+def _extras(tabela):
+    datas = tabela[COLUNA_DATA]
+    return {'primeira_compra': (datas, 'min'), 'ultima_compra': (datas, 'max')}
+
+
+def _montar(tabela, rollup, clientes, codigos):
+    pedidos, _ = codigos_inteiros(tabela['order_id'])
+    cliente_do_pedido = np.full(rollup.total_pedidos, -1, dtype=np.int32)
+    cliente_do_pedido[pedidos] = codigos
+    cliente_do_pedido.flags.writeable = False
+    ordem = np.argsort(rollup.baldes['cliente'].to_numpy(), kind='stable')
+    ordem.flags.writeable = False
+
+    resultado = Clientes(
+        rollup=rollup,
+        ids=clientes.cat.categories,
+        cliente_do_pedido=cliente_do_pedido,
+        ordem=ordem,
+        referencia=tabela[COLUNA_DATA].max().normalize() + pd.Timedelta(days=1),
+        perfil=None,
+    )
+    resultado.perfil = _perfil(resultado, np.ones(len(rollup.baldes), dtype=bool))
+    return resultado
+
+
+def construir_clientes(tabela):
+    clientes = tabela['customer_unique_id'].astype('category')
+    codigos = clientes.cat.codes.to_numpy()
+    rollup = construir_rollup(tabela, {'cliente': codigos}, _extras(tabela))
+    return _montar(tabela, rollup, clientes, codigos)
+
+
+def estender_clientes(anterior, tabela, inicio):
+    clientes = tabela['customer_unique_id'].astype('category')
+    codigos = clientes.cat.codes.to_numpy()
+    delta = tabela.iloc[inicio:]
+    rollup = estender_rollup(anterior.rollup, delta, {'cliente': codigos[inicio:]}, _extras(delta))
+    return _montar(tabela, rollup, clientes, codigos)
+
+
+def selecao(clientes, categorias=None, pagamento=None, reviews=None):
+    return mascara_rollup(clientes.rollup, categorias, pagamento, reviews)
+
+
+def perfil_selecionado(clientes, mascara):
+    if mascara.all():
+        return clientes.perfil
+    return _perfil(clientes, mascara)
+
+
+def perfis(clientes, categorias=None, pagamento=None, reviews=None):
+    return perfil_selecionado(clientes, selecao(clientes, categorias, pagamento, reviews))
+
+
+def indicadores(perfil):
+    if perfil.empty:
+        return None
+    return {
+        'clientes': len(perfil),
+        'recompra': float((perfil['Pedidos'] > 1).mean()),
+        'ltv': float(perfil['Receita'].mean()),
+        'pedidos': float(perfil['Pedidos'].mean()),
+    }
+
+
+def resumo_segmentos(perfil):
+    resumo = perfil.groupby('Segmento', observed=True, sort=True).agg(**{
+        'Clientes': ('Pedidos', 'size'),
+        'Receita': ('Receita', 'sum'),
+        'LTV médio': ('Receita', 'mean'),
+        'Pedidos médios': ('Pedidos', 'mean'),
+        'Recência média (dias)': ('Recência (dias)', 'mean'),
+    })
+    resumo.insert(1, '% dos clientes', resumo['Clientes'] / len(perfil))
+    return resumo
+
+
+def por_segmento(perfil, segmento, limite=50):
+    selecionados = perfil[(perfil['Segmento'] == segmento).to_numpy()]
+    return selecionados.sort_values('Receita', ascending=False, kind='stable').head(limite)
@@ -0,0 +1,177 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from . import hll
+
+
+DIMENSOES = ['product_category_name', 'payment_type', 'review_score']
+MEDIDAS = ['price', 'freight_value', 'payment_value']
+
+
+@dataclass
+class CuboOlap:
+    celulas: pd.DataFrame
+    pedidos: list
+    clientes: list
+    total_pedidos: int
+    total_clientes: int
+    sketches_pedidos: np.ndarray
+    sketches_clientes: np.ndarray
+
+
+def _conjuntos_por_celula(celula, codigos, n_celulas):
+    n_codigos = int(codigos.max()) + 1 if len(codigos) else 1
+    pares = np.unique(celula.astype(np.int64) * n_codigos + codigos)
+    celulas_pares = pares // n_codigos
+    limites = np.searchsorted(celulas_pares, np.arange(1, n_celulas))
+    conjuntos = (pares % n_codigos).astype(np.int32)
+    conjuntos.flags.writeable = False
+    return np.split(conjuntos, limites)
+
+
+def codigos_inteiros(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), len(serie.cat.categories)
+    codigos, valores = pd.factorize(serie)
+    return codigos, len(valores)
+
+
+def construir_cubo(tabela):
+    base = tabela[DIMENSOES].copy()
+    for medida in MEDIDAS:
+        base[medida] = tabela[medida].astype('float64')
+
+    agrupado = base.groupby(DIMENSOES, observed=True, dropna=False, sort=True)
+    agregacoes = {'linhas': ('review_score', 'size')}
+    for medida in MEDIDAS:
+        agregacoes[f'soma_{medida}'] = (medida, 'sum')
+        agregacoes[f'n_{medida}'] = (medida, 'count')
+    celulas = agrupado.agg(**agregacoes).reset_index()
+    celulas['celula'] = np.arange(len(celulas))
+
+    celula = agrupado.ngroup().to_numpy()
+    pedidos, total_pedidos = codigos_inteiros(tabela['order_id'])
+    clientes, total_clientes = codigos_inteiros(tabela['customer_unique_id'])
+
+    sketches_pedidos = hll.registros_por_grupo(hll.hash_ids(pedidos), celula, len(celulas))
+    sketches_clientes = hll.registros_por_grupo(hll.hash_ids(clientes), celula, len(celulas))
+    sketches_pedidos.flags.writeable = False
+    sketches_clientes.flags.writeable = False
+
+    return CuboOlap(
+        celulas=celulas,
+        pedidos=_conjuntos_por_celula(celula, pedidos, len(celulas)),
+        clientes=_conjuntos_por_celula(celula, clientes, len(celulas)),
+        total_pedidos=total_pedidos,
+        total_clientes=total_clientes,
+        sketches_pedidos=sketches_pedidos,
+        sketches_clientes=sketches_clientes,
+    )
+
+
+def _unir_conjuntos(grupos, fontes, n_celulas):
+    partes = [[] for _ in range(n_celulas)]
+    for grupo, conjunto in zip(grupos, fontes):
+        partes[grupo].append(conjunto)
+    unidos = []
+    for conjuntos in partes:
+        conjunto = conjuntos[0] if len(conjuntos) == 1 else np.unique(np.concatenate(conjuntos))
+        conjunto.flags.writeable = False
+        unidos.append(conjunto)
+    return unidos
+
+
+def _unir_sketches(grupos, anteriores, novos, n_celulas):
+    registros = np.zeros((n_celulas, anteriores.shape[1]), dtype=np.uint8)
+    grupos_anteriores, grupos_novos = grupos[:len(anteriores)], grupos[len(anteriores):]
+    registros[grupos_anteriores] = anteriores
+    registros[grupos_novos] = np.maximum(registros[grupos_novos], novos)
+    registros.flags.writeable = False
+    return registros
+
+
+def estender_cubo(cubo, tabela, inicio):
+    novo = construir_cubo(tabela.iloc[inicio:])
+
+    combinadas = pd.concat([cubo.celulas, novo.celulas], ignore_index=True)
+    for dimensao in DIMENSOES:
+        combinadas[dimensao] = combinadas[dimensao].astype(tabela[dimensao].dtype)
+    agrupado = combinadas.drop(columns='celula').groupby(DIMENSOES, observed=True, dropna=False, sort=True)
+    celulas = agrupado.sum().reset_index()
+    celulas['celula'] = np.arange(len(celulas))
+    grupos = agrupado.ngroup().to_numpy()
+
+    return CuboOlap(
+        celulas=celulas,
+        pedidos=_unir_conjuntos(grupos, cubo.pedidos + novo.pedidos, len(celulas)),
+        clientes=_unir_conjuntos(grupos, cubo.clientes + novo.clientes, len(celulas)),
+        total_pedidos=novo.total_pedidos,
+        total_clientes=novo.total_clientes,
+        sketches_pedidos=_unir_sketches(grupos, cubo.sketches_pedidos, novo.sketches_pedidos, len(celulas)),
+        sketches_clientes=_unir_sketches(grupos, cubo.sketches_clientes, novo.sketches_clientes, len(celulas)),
+    )
+
+
+def mascara_filtros(celulas, categorias=None, pagamento=None, reviews=None):
+    mascara = np.ones(len(celulas), dtype=bool)
+    if categorias:
+        mascara &= celulas['product_category_name'].isin(categorias).to_numpy()
+    if pagamento:
+        mascara &= (celulas['payment_type'] == pagamento).to_numpy()
+    if reviews:
+        mascara &= celulas['review_score'].isin(reviews).to_numpy()
+    return mascara
+
+
+def fatiar(cubo, categorias=None, pagamento=None, reviews=None):
+    celulas = cubo.celulas
+    return celulas[mascara_filtros(celulas, categorias, pagamento, reviews)]
+
+
+def total_linhas(fatia):
+    return int(fatia['linhas'].sum())
+
+
+def media(fatia, medida):
+    if medida in DIMENSOES:
+        return (fatia[medida].astype('float64') * fatia['linhas']).sum() / fatia['linhas'].sum()
+    return fatia[f'soma_{medida}'].sum() / fatia[f'n_{medida}'].sum()
+
+
+def distintos(cubo, fatia, medida, aproximado=False):
+    if aproximado:
+        sketches = getattr(cubo, f'sketches_{medida}')
+        return int(round(hll.estimar(hll.unir(sketches[fatia['celula'].to_numpy()]))))
+
+    conjuntos = getattr(cubo, medida)
+    total = getattr(cubo, f'total_{medida}')
+    partes = [conjuntos[i] for i in fatia['celula']]
+    if not partes:
+        return 0
+    marcados = np.zeros(total, dtype=bool)
+    marcados[np.concatenate(partes)] = True
+    return int(marcados.sum())
+
+
+def valores_distintos(fatia, dimensao):
+    return fatia[dimensao].nunique(dropna=False)
+
+
+def contagem_por(fatia, dimensao):
+    contagem = fatia.groupby(dimensao, observed=True)['linhas'].sum()
+    contagem = contagem[contagem > 0].sort_values(ascending=False, kind='stable')
+    contagem.name = 'count'
+    return contagem
+
+
+def tabela_cruzada(fatia, linhas, colunas):
+    return fatia.pivot_table(
+        index=linhas,
+        columns=colunas,
+        values='linhas',
+        aggfunc='sum',
+        fill_value=0,
+        observed=True
+    )
@@ -0,0 +1,600 @@
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .clientes import Clientes, construir_clientes, estender_clientes
+from .cubo import CuboOlap, construir_cubo, estender_cubo
+from .geografia import ARQUIVO_GEOLOCALIZACAO, Regioes, construir_regioes, estender_regioes, ler_centroides
+from .indice import IndiceFiltros, construir_indice, estender_indice
+from .temporal import construir_rollups, estender_rollups
+
+
+COLUNAS_FINAIS = [
+    'customer_unique_id',
+    'order_id',
+    'product_category_name',
+    'price',
+    'freight_value',
+    'payment_type',
+    'payment_installments',
+    'payment_value',
+    'order_status',
+    'review_score',
+    'order_purchase_timestamp',
+    'order_delivered_customer_date',
+    'order_estimated_delivery_date',
+    'customer_zip_code_prefix',
+    'customer_city',
+    'customer_state',
+    'linhas_por_item',
+]
+
+# Colunas de apoio às agregações, fora da tabela exibida e exportada.
+COLUNAS_INTERNAS = ['linhas_por_item']
+
+ESQUEMA = {
+    'product_category_name': 'category',
+    'price': 'float32',
+    'freight_value': 'float32',
+    'payment_type': 'category',
+    'payment_installments': 'int8',
+    'payment_value': 'float32',
+    'order_status': 'category',
+    'review_score': 'int8',
+    'order_purchase_timestamp': 'datetime64[s]',
+    'order_delivered_customer_date': 'datetime64[s]',
+    'order_estimated_delivery_date': 'datetime64[s]',
+    'customer_zip_code_prefix': 'int32',
+    'customer_city': 'category',
+    'customer_state': 'category',
+    'linhas_por_item': 'int16',
+}
+
+CHAVE_VERSAO = b'olist_versao'
+
+DATASET_KAGGLE = 'olistbr/brazilian-ecommerce'
+
+PASTA_SNAPSHOTS = os.path.join(os.path.expanduser('~'), '.cache', 'olist')
+
+GRAOS = ('item', 'pedido')
+
+IDS = {
+    'order_id': 'pedidos',
+    'customer_id': 'clientes',
+    'customer_unique_id': 'clientes',
+    'product_id': 'produtos',
+}
+
+ARQUIVOS = {
+    'clientes': ('olist_customers_dataset.csv', {
+        'customer_id': 'str',
+        'customer_unique_id': 'str',
+        'customer_zip_code_prefix': 'int32',
+        'customer_city': 'category',
+        'customer_state': 'category',
+    }),
+    'pedidos': ('olist_orders_dataset.csv', {
+        'order_id': 'str',
+        'customer_id': 'str',
+        'order_status': 'category',
+        'order_purchase_timestamp': 'datetime64[s]',
+        'order_delivered_customer_date': 'datetime64[s]',
+        'order_estimated_delivery_date': 'datetime64[s]',
+    }),
+    'itens': ('olist_order_items_dataset.csv', {
+        'order_id': 'str',
+        'product_id': 'str',
+        'price': 'float32',
+        'freight_value': 'float32',
+    }),
+    'produtos': ('olist_products_dataset.csv', {
+        'product_id': 'str',
+        'product_category_name': 'category',
+    }),
+    'pagamentos': ('olist_order_payments_dataset.csv', {
+        'order_id': 'str',
+        'payment_type': 'category',
+        'payment_installments': 'float32',
+        'payment_value': 'float32',
+    }),
+    'reviews': ('olist_order_reviews_dataset.csv', {
+        'order_id': 'str',
+        'review_score': 'float32',
+    }),
+}
+
+
+@dataclass
+class DadosOlist:
+    tabela_final: pd.DataFrame
+    versao: tuple
+    tempos: dict
+    indice: IndiceFiltros
+    cubo: CuboOlap
+    rollups: dict
+    regioes: Regioes
+    clientes: Clientes
+
+
+def resolver_origem(configurada=None):
+    if configurada:
+        if not os.path.exists(configurada):
+            raise FileNotFoundError(f"Origem de dados '{configurada}' não encontrada")
+        return configurada
+
+    import kagglehub
+    return kagglehub.dataset_download(DATASET_KAGGLE)
+
+
+def versao_dataset(caminho):
+    if os.path.isfile(caminho):
+        info = os.stat(caminho)
+        return (os.path.abspath(caminho), ((os.path.basename(caminho), info.st_mtime_ns, info.st_size),))
+
+    versao = []
+    for arquivo, _ in ARQUIVOS.values():
+        info = os.stat(os.path.join(caminho, arquivo))
+        versao.append((arquivo, info.st_mtime_ns, info.st_size))
+    geolocalizacao = os.path.join(caminho, ARQUIVO_GEOLOCALIZACAO)
+    if os.path.exists(geolocalizacao):
+        info = os.stat(geolocalizacao)
+        versao.append((ARQUIVO_GEOLOCALIZACAO, info.st_mtime_ns, info.st_size))
+    return (os.path.abspath(caminho), tuple(versao))
+
+
+def ler_arquivos(caminho):
+    tabelas = {}
+    for nome, (arquivo, tipos) in ARQUIVOS.items():
+        origem = os.path.join(caminho, arquivo)
+        if not os.path.exists(origem):
+            raise FileNotFoundError(f"Arquivo '{arquivo}' não encontrado em {caminho}")
+        datas = [coluna for coluna, tipo in tipos.items() if tipo.startswith('datetime64')]
+        tabela = pd.read_csv(
+            origem,
+            usecols=list(tipos),
+            dtype={coluna: tipo for coluna, tipo in tipos.items() if coluna not in datas},
+            parse_dates=datas,
+            date_format='%Y-%m-%d %H:%M:%S'
+        )
+        tabelas[nome] = tabela.astype({coluna: tipos[coluna] for coluna in datas})
+    return tabelas
+
+
+def codificar_ids(tabelas):
+    vocabularios = {
+        coluna: pd.Index(tabelas[origem][coluna].unique())
+        for coluna, origem in IDS.items()
+    }
+
+    codificadas = {}
+    for nome, tabela in tabelas.items():
+        tabela = tabela.copy()
+        for coluna, vocabulario in vocabularios.items():
+            if coluna in tabela:
+                tabela[coluna] = vocabulario.get_indexer(tabela[coluna]).astype(np.int32)
+        codificadas[nome] = tabela
+    return codificadas, vocabularios
+
+
+def decodificar_ids(tabela, vocabularios):
+    for coluna, vocabulario in vocabularios.items():
+        if coluna in tabela:
+            tabela[coluna] = pd.Categorical.from_codes(tabela[coluna], categories=vocabulario)
+    return tabela
+
+
+def ids_como_texto(tabela):
+    colunas = {
+        coluna: tabela[coluna].astype('str')
+        for coluna in IDS
+        if coluna in tabela and isinstance(tabela[coluna].dtype, pd.CategoricalDtype)
+    }
+    return tabela.assign(**colunas)
+
+
+def para_exibicao(tabela):
+    return ids_como_texto(tabela.drop(columns=COLUNAS_INTERNAS, errors='ignore'))
+
+
+def preparar_pagamentos(pagamentos, grao='item'):
+    pagamentos = pagamentos[
+        (pagamentos['payment_type'].notna()) &
+        (pagamentos['payment_type'] != 'not_defined')
+    ]
+    if grao == 'pedido':
+        pagamentos = (
+            pagamentos
+            .sort_values('payment_value', ascending=False, kind='stable')
+            .groupby('order_id', sort=False, observed=True)
+            .agg(
+                payment_type=('payment_type', 'first'),
+                payment_installments=('payment_installments', 'max'),
+                payment_value=('payment_value', 'sum'),
+            )
+            .reset_index()
+        )
+    return pagamentos
+
+
+def preparar_reviews(reviews, grao='item'):
+    reviews = reviews[reviews['review_score'].notna()]
+    if grao == 'pedido':
+        reviews = (
+            reviews
+            .groupby('order_id', sort=False)['review_score']
+            .mean()
+            .add(0.5)
+            .floordiv(1)
+            .reset_index()
+        )
+    return reviews
+
+
+def montar_tabela_final(tabelas, grao='item'):
+    if grao not in GRAOS:
+        raise ValueError(f"Grão '{grao}' inválido; use um de {GRAOS}")
+
+    tabelas, vocabularios = codificar_ids(tabelas)
+    pagamentos = preparar_pagamentos(tabelas['pagamentos'], grao)
+    reviews = preparar_reviews(tabelas['reviews'], grao)
+    itens = (
+        tabelas['itens']
+        .merge(tabelas['produtos'], on='product_id', how='left')
+        .drop(columns='product_id')
+    )
+
+    tabela_final = (
+        tabelas['clientes']
+        .merge(tabelas['pedidos'], on='customer_id')
+        .drop(columns='customer_id')
+        .merge(itens, on='order_id', how='left')
+        .merge(pagamentos, on='order_id')
+        .merge(reviews, on='order_id')
+    )
+    # Cada item se repete uma vez por combinação de pagamento e review do pedido.
+    n_pedidos = len(vocabularios['order_id'])
+    repeticoes = np.ones(n_pedidos, dtype=np.int64)
+    for tabela in (pagamentos, reviews):
+        codigos = tabela['order_id'].to_numpy()
+        repeticoes *= np.bincount(codigos[codigos >= 0], minlength=n_pedidos)
+    tabela_final['linhas_por_item'] = repeticoes[tabela_final['order_id'].to_numpy()]
+    tabela_final = decodificar_ids(tabela_final[COLUNAS_FINAIS].copy(), vocabularios)
+    return aplicar_esquema(tabela_final)
+
+
+def aplicar_esquema(tabela):
+    tabela = tabela.astype(ESQUEMA)
+    tabela['payment_type'] = tabela['payment_type'].cat.remove_unused_categories()
+    return tabela.reset_index(drop=True)
+
+
+def chave_origem(configurada=None):
+    # Cada versão baixada do Kaggle fica numa pasta nova; a chave não pode depender dela.
+    return os.path.abspath(configurada) if configurada else DATASET_KAGGLE
+
+
+def caminho_snapshot(chave, grao='item'):
+    if chave == DATASET_KAGGLE:
+        return os.path.join(PASTA_SNAPSHOTS, f"{chave.replace('/', '_')}_tabela_final_{grao}.parquet")
+    chave = os.path.abspath(chave)
+    return os.path.join(os.path.dirname(chave), f'{os.path.basename(chave)}_tabela_final_{grao}.parquet')
+
+
+def _versao_serializada(versao):
+    return json.dumps({'colunas': COLUNAS_FINAIS, 'versao': versao}).encode('utf-8')
+
+
+def salvar_snapshot(tabela_final, destino, versao):
+    import pyarrow as pa
+
+    tabela = pa.Table.from_pandas(tabela_final, preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[CHAVE_VERSAO] = _versao_serializada(versao)
+    tabela = tabela.replace_schema_metadata(metadados)
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f'{destino}.{os.getpid()}.tmp'
+    pq.write_table(tabela, temporario)
+    os.replace(temporario, destino)
+
+
+def ler_snapshot(origem, versao):
+    if not os.path.exists(origem):
+        return None
+    metadados = pq.read_schema(origem).metadata or {}
+    if metadados.get(CHAVE_VERSAO) != _versao_serializada(versao):
+        return None
+    return aplicar_esquema(pd.read_parquet(origem, memory_map=True))
+
+
+def _contidos(serie, valores):
+    return pd.Index(pd.unique(valores)).get_indexer(serie) >= 0
+
+
+ASSINATURA = ['linhas', 'price', 'payment_value', 'review_score']
+
+
+def _somas_por_pedido(tabela, coluna, ids):
+    posicao = ids.get_indexer(tabela['order_id'])
+    encontrados = posicao >= 0
+    posicao = posicao[encontrados]
+    valores = np.nan_to_num(tabela[coluna].to_numpy(dtype='float64', na_value=np.nan)[encontrados])
+    return (
+        np.bincount(posicao, minlength=len(ids)),
+        np.bincount(posicao, weights=valores, minlength=len(ids)),
+    )
+
+
+def assinatura_arquivos(tabelas, grao='item'):
+    ids = pd.Index(tabelas['pedidos']['order_id'])
+    n_itens, soma_price = _somas_por_pedido(tabelas['itens'], 'price', ids)
+    n_pagamentos, soma_pagamentos = _somas_por_pedido(preparar_pagamentos(tabelas['pagamentos'], grao), 'payment_value', ids)
+    n_reviews, soma_reviews = _somas_por_pedido(preparar_reviews(tabelas['reviews'], grao), 'review_score', ids)
+
+    # Cada item se repete por pagamento e por review do pedido; pedidos sem itens ainda geram uma linha.
+    linhas_itens = np.maximum(n_itens, 1)
+    return np.column_stack([
+        linhas_itens * n_pagamentos * n_reviews,
+        soma_price * n_pagamentos * n_reviews,
+        soma_pagamentos * linhas_itens * n_reviews,
+        soma_reviews * linhas_itens * n_pagamentos,
+    ])
+
+
+def assinatura_tabela(tabela_final):
+    codigos = tabela_final['order_id'].cat.codes.to_numpy()
+    n_pedidos = len(tabela_final['order_id'].cat.categories)
+    colunas = [np.bincount(codigos, minlength=n_pedidos)]
+    for coluna in ASSINATURA[1:]:
+        pesos = np.nan_to_num(tabela_final[coluna].to_numpy(dtype='float64', na_value=np.nan))
+        colunas.append(np.bincount(codigos, weights=pesos, minlength=n_pedidos))
+    return np.column_stack(colunas)
+
+
+def pedidos_delta(tabela_final, tabelas, grao='item'):
+    pedidos = tabelas['pedidos']
+    ids = tabela_final['order_id'].cat
+    status = tabela_final['order_status'].cat
+
+    status_anterior = np.full(len(ids.categories), -2, dtype=np.int64)
+    status_anterior[ids.codes.to_numpy()] = status.codes.to_numpy()
+    posicao = ids.categories.get_indexer(pedidos['order_id'])
+    anterior = np.where(posicao >= 0, status_anterior[posicao], -2)
+    atual = status.categories.get_indexer(pedidos['order_status'])
+
+    presentes = anterior != -2
+    assinatura_anterior = assinatura_tabela(tabela_final)[np.where(presentes, posicao, 0)]
+    assinatura_atual = assinatura_arquivos(tabelas, grao)
+    alterados = presentes & (
+        (anterior != atual) |
+        ~np.isclose(assinatura_anterior, assinatura_atual, rtol=1e-6, atol=1e-3).all(axis=1)
+    )
+
+    removidos = np.zeros(len(ids.categories), dtype=bool)
+    removidos[posicao[alterados]] = True
+    return ~presentes | alterados, removidos[ids.codes.to_numpy()]
+
+
+def _estender_ids(serie, delta):
+    categorias = serie.cat.categories
+    novas = delta.cat.categories.difference(categorias, sort=False)
+    categorias = categorias.append(novas)
+    codigos = np.concatenate([
+        serie.cat.codes.to_numpy(),
+        categorias.get_indexer(delta.astype('str')),
+    ])
+    return pd.Categorical.from_codes(codigos, dtype=pd.CategoricalDtype(categorias))
+
+
+def concatenar_tabelas(tabela, delta):
+    colunas = {}
+    for coluna in tabela.columns:
+        if coluna in IDS:
+            colunas[coluna] = _estender_ids(tabela[coluna], delta[coluna])
+        elif isinstance(tabela[coluna].dtype, pd.CategoricalDtype):
+            colunas[coluna] = pd.api.types.union_categoricals(
+                [tabela[coluna], delta[coluna]],
+                sort_categories=True,
+                ignore_order=True
+            )
+        else:
+            colunas[coluna] = np.concatenate([tabela[coluna].to_numpy(), delta[coluna].to_numpy()])
+    return aplicar_esquema(pd.DataFrame(colunas))
+
+
+def mesclar_delta(tabela_final, tabelas, grao='item'):
+    novos, removidos = pedidos_delta(tabela_final, tabelas, grao)
+    if not novos.any():
+        return tabela_final, len(tabela_final)
+
+    pedidos = tabelas['pedidos'][novos]
+    delta = {
+        'clientes': tabelas['clientes'][_contidos(tabelas['clientes']['customer_id'], pedidos['customer_id'])],
+        'pedidos': pedidos,
+    }
+    for nome in ('itens', 'pagamentos', 'reviews'):
+        delta[nome] = tabelas[nome][_contidos(tabelas[nome]['order_id'], pedidos['order_id'])]
+    delta['produtos'] = tabelas['produtos'][_contidos(tabelas['produtos']['product_id'], delta['itens']['product_id'])]
+    tabela_delta = montar_tabela_final(delta, grao)
+
+    if removidos.any():
+        tabela_final = tabela_final[~removidos]
+        inicio = None
+    elif len(tabela_delta) == 0:
+        return tabela_final, len(tabela_final)
+    else:
+        inicio = len(tabela_final)
+    return concatenar_tabelas(tabela_final, tabela_delta), inicio
+
+
+def _versao_arquivo(versao, arquivo):
+    return next((item for item in versao[1] if item[0] == arquivo), None)
+
+
+def _regioes(caminho, tabela_final, tempos, anterior=None, versao=None, inicio_delta=None):
+    inicio = time.perf_counter()
+    reaproveitar = anterior is not None and (
+        _versao_arquivo(anterior.versao, ARQUIVO_GEOLOCALIZACAO) == _versao_arquivo(versao, ARQUIVO_GEOLOCALIZACAO)
+    )
+    centroides = anterior.regioes.centroides_cep if reaproveitar else ler_centroides(caminho)
+    fim_geolocalizacao = time.perf_counter()
+    if reaproveitar and inicio_delta == len(tabela_final):
+        regioes = anterior.regioes
+    elif reaproveitar and inicio_delta is not None:
+        regioes = estender_regioes(anterior.regioes, tabela_final, inicio_delta)
+    else:
+        regioes = construir_regioes(tabela_final, centroides)
+    tempos['geolocalizacao'] = fim_geolocalizacao - inicio
+    tempos['regioes'] = time.perf_counter() - fim_geolocalizacao
+    return regioes
+
+
+def _estruturas(tabela_final, tempos, anterior=None, inicio=None):
+    incremental = anterior is not None and inicio is not None
+    if incremental and inicio == len(tabela_final):
+        tempos['indice'] = tempos['cubo'] = tempos['rollups'] = tempos['clientes'] = 0.0
+        return anterior.indice, anterior.cubo, anterior.rollups, anterior.clientes
+
+    inicio_indice = time.perf_counter()
+    if incremental:
+        indice = estender_indice(anterior.indice, tabela_final, inicio)
+    else:
+        indice = construir_indice(tabela_final)
+    tempos['indice'] = time.perf_counter() - inicio_indice
+
+    inicio_cubo = time.perf_counter()
+    if incremental:
+        cubo = estender_cubo(anterior.cubo, tabela_final, inicio)
+    else:
+        cubo = construir_cubo(tabela_final)
+    tempos['cubo'] = time.perf_counter() - inicio_cubo
+
+    inicio_rollups = time.perf_counter()
+    if incremental:
+        rollups = estender_rollups(anterior.rollups, tabela_final, inicio)
+    else:
+        rollups = construir_rollups(tabela_final)
+    tempos['rollups'] = time.perf_counter() - inicio_rollups
+
+    inicio_clientes = time.perf_counter()
+    if incremental:
+        clientes = estender_clientes(anterior.clientes, tabela_final, inicio)
+    else:
+        clientes = construir_clientes(tabela_final)
+    tempos['clientes'] = time.perf_counter() - inicio_clientes
+    return indice, cubo, rollups, clientes
+
+
+def atualizar_dados(anterior, caminho, versao=None, grao='item', usar_snapshot=True, chave=None):
+    if os.path.isfile(caminho):
+        return carregar_dados(caminho, versao, grao, usar_snapshot, chave=chave)
+    if versao is None:
+        versao = versao_dataset(caminho)
+
+    inicio = time.perf_counter()
+    tabelas = ler_arquivos(caminho)
+    fim_leitura = time.perf_counter()
+    tabela_final, inicio_delta = mesclar_delta(anterior.tabela_final, tabelas, grao)
+    fim_delta = time.perf_counter()
+    tempos = {
+        'leitura': fim_leitura - inicio,
+        'delta': fim_delta - fim_leitura,
+    }
+    if usar_snapshot:
+        try:
+            salvar_snapshot(tabela_final, caminho_snapshot(chave or caminho, grao), versao)
+        except OSError:
+            pass
+
+    indice, cubo, rollups, clientes = _estruturas(tabela_final, tempos, anterior, inicio_delta)
+    return DadosOlist(
+        tabela_final=tabela_final,
+        versao=versao,
+        tempos=tempos,
+        indice=indice,
+        cubo=cubo,
+        rollups=rollups,
+        regioes=_regioes(caminho, tabela_final, tempos, anterior, versao, inicio_delta),
+        clientes=clientes
+    )
+
+
+def carregar_dados(caminho, versao=None, grao='item', usar_snapshot=True, incremental=False, chave=None):
+    if versao is None:
+        versao = versao_dataset(caminho)
+    snapshot = caminho_snapshot(chave or caminho, grao)
+
+    inicio = time.perf_counter()
+    if os.path.isfile(caminho):
+        tabela_final = pd.read_parquet(caminho, memory_map=True)
+        if 'linhas_por_item' not in tabela_final:
+            # Arquivos gerados antes da coluna: sem a contagem, cada linha vale um item.
+            tabela_final['linhas_por_item'] = np.int16(1)
+        tabela_final = aplicar_esquema(tabela_final)
+    else:
+        tabela_final = ler_snapshot(snapshot, versao) if usar_snapshot else None
+    if tabela_final is not None:
+        tempos = {'snapshot': time.perf_counter() - inicio}
+    elif incremental and usar_snapshot and os.path.exists(snapshot) and pq.read_schema(snapshot).names == COLUNAS_FINAIS:
+        anterior = aplicar_esquema(pd.read_parquet(snapshot, memory_map=True))
+        fim_snapshot = time.perf_counter()
+        tabelas = ler_arquivos(caminho)
+        fim_leitura = time.perf_counter()
+        tabela_final, _ = mesclar_delta(anterior, tabelas, grao)
+        fim_delta = time.perf_counter()
+
+        tempos = {
+            'snapshot': fim_snapshot - inicio,
+            'leitura': fim_leitura - fim_snapshot,
+            'delta': fim_delta - fim_leitura,
+        }
+        try:
+            salvar_snapshot(tabela_final, snapshot, versao)
+        except OSError:
+            pass
+    else:
+        tabelas = ler_arquivos(caminho)
+        fim_leitura = time.perf_counter()
+        tabela_final = montar_tabela_final(tabelas, grao)
+        fim_merge = time.perf_counter()
+
+        tempos = {
+            'leitura': fim_leitura - inicio,
+            'merge': fim_merge - fim_leitura,
+        }
+        if usar_snapshot:
+            try:
+                salvar_snapshot(tabela_final, snapshot, versao)
+            except OSError:
+                pass
+
+    indice, cubo, rollups, clientes = _estruturas(tabela_final, tempos)
+    return DadosOlist(
+        tabela_final=tabela_final,
+        versao=versao,
+        tempos=tempos,
+        indice=indice,
+        cubo=cubo,
+        rollups=rollups,
+        regioes=_regioes(caminho, tabela_final, tempos),
+        clientes=clientes
+    )
+
+
+if __name__ == '__main__':
+    configurada = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('OLIST_DADOS')
+    origem = resolver_origem(configurada)
+    chave = chave_origem(configurada)
+    grao = sys.argv[2] if len(sys.argv) > 2 else 'item'
+    if len(sys.argv) > 3 and sys.argv[3] == 'incremental':
+        tabela_final = carregar_dados(origem, grao=grao, incremental=True, chave=chave).tabela_final
+    else:
+        tabela_final = montar_tabela_final(ler_arquivos(origem), grao)
+        salvar_snapshot(tabela_final, caminho_snapshot(chave, grao), versao_dataset(origem))
+    print(f'Snapshot com {len(tabela_final):,} linhas salvo em {caminho_snapshot(chave, grao)}')
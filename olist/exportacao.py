@@ -0,0 +1,69 @@
+import gzip
+import io
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .dados import para_exibicao
+
+
+FORMATOS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+TAMANHO_BLOCO = 50_000
+
+
+def blocos(tabela, posicoes=None, tamanho=TAMANHO_BLOCO):
+    if posicoes is None:
+        posicoes = np.arange(len(tabela))
+    for inicio in range(0, len(posicoes), tamanho):
+        yield para_exibicao(tabela.take(posicoes[inicio:inicio + tamanho]))
+
+
+def escrever_csv(tabela, destino, posicoes=None):
+    texto = io.TextIOWrapper(destino, encoding='utf-8', newline='')
+    try:
+        cabecalho = True
+        for bloco in blocos(tabela, posicoes):
+            bloco.to_csv(texto, index=False, header=cabecalho)
+            cabecalho = False
+        if cabecalho:
+            para_exibicao(tabela.head(0)).to_csv(texto, index=False)
+    finally:
+        texto.flush()
+        texto.detach()
+
+
+def escrever_parquet(tabela, destino, posicoes=None):
+    escritor = None
+    try:
+        for bloco in blocos(tabela, posicoes):
+            lote = pa.Table.from_pandas(bloco, preserve_index=False)
+            if escritor is None:
+                escritor = pq.ParquetWriter(destino, lote.schema)
+            escritor.write_table(lote)
+        if escritor is None:
+            pq.write_table(pa.Table.from_pandas(para_exibicao(tabela.head(0)), preserve_index=False), destino)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def gerar_exportacao(tabela, posicoes=None, formato='CSV'):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' inválido; use um de {list(FORMATOS)}")
+
+    arquivo = io.BytesIO()
+    if formato == 'Parquet':
+        escrever_parquet(tabela, arquivo, posicoes)
+    elif formato == 'CSV (gzip)':
+        with gzip.GzipFile(fileobj=arquivo, mode='wb') as compactado:
+            escrever_csv(tabela, compactado, posicoes)
+    else:
+        escrever_csv(tabela, arquivo, posicoes)
+
+    return arquivo.getvalue()
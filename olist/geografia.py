@@ -0,0 +1,101 @@
+import os
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .rollup import Rollup, agregar, construir_rollup, estender_rollup, mascara_rollup
+
+
+ARQUIVO_GEOLOCALIZACAO = 'olist_geolocation_dataset.csv'
+
+TIPOS_GEOLOCALIZACAO = {
+    'geolocation_zip_code_prefix': 'int32',
+    'geolocation_lat': 'float64',
+    'geolocation_lng': 'float64',
+}
+
+# O arquivo de geolocalização tem coordenadas fora do Brasil que distorcem as médias.
+LIMITES_BRASIL = {
+    'geolocation_lat': (-34.0, 5.5),
+    'geolocation_lng': (-74.0, -34.0),
+}
+
+
+@dataclass
+class Regioes:
+    estados: Rollup
+    cidades: Rollup
+    centroides_cep: pd.DataFrame
+    centroides_estados: pd.DataFrame
+    centroides_cidades: pd.DataFrame
+
+
+def ler_centroides(caminho):
+    origem = os.path.join(caminho, ARQUIVO_GEOLOCALIZACAO)
+    if not os.path.isfile(origem):
+        return None
+
+    geolocalizacao = pd.read_csv(origem, usecols=list(TIPOS_GEOLOCALIZACAO), dtype=TIPOS_GEOLOCALIZACAO)
+    dentro = pd.Series(True, index=geolocalizacao.index)
+    for coluna, (minimo, maximo) in LIMITES_BRASIL.items():
+        dentro &= geolocalizacao[coluna].between(minimo, maximo)
+
+    return (
+        geolocalizacao[dentro]
+        .groupby('geolocation_zip_code_prefix')
+        .agg(lat=('geolocation_lat', 'mean'), lon=('geolocation_lng', 'mean'))
+    )
+
+
+def _centroides_por(tabela, chaves, centroides_cep):
+    colunas = ['lat', 'lon']
+    if centroides_cep is None:
+        centroides_cep = pd.DataFrame(columns=colunas, index=pd.Index([], dtype='int32'), dtype='float64')
+    ceps = tabela[chaves + ['customer_zip_code_prefix']].drop_duplicates()
+    ceps = ceps.join(centroides_cep, on='customer_zip_code_prefix', how='inner')
+    return ceps.groupby(chaves, observed=True)[colunas].mean()
+
+
+def _chaves_estados(tabela):
+    return {'customer_state': tabela['customer_state']}
+
+
+def _chaves_cidades(tabela):
+    return {'customer_state': tabela['customer_state'], 'customer_city': tabela['customer_city']}
+
+
+def construir_regioes(tabela, centroides_cep=None):
+    return Regioes(
+        estados=construir_rollup(tabela, _chaves_estados(tabela)),
+        cidades=construir_rollup(tabela, _chaves_cidades(tabela)),
+        centroides_cep=centroides_cep,
+        centroides_estados=_centroides_por(tabela, ['customer_state'], centroides_cep),
+        centroides_cidades=_centroides_por(tabela, ['customer_state', 'customer_city'], centroides_cep),
+    )
+
+
+def estender_regioes(regioes, tabela, inicio):
+    delta = tabela.iloc[inicio:]
+    return Regioes(
+        estados=estender_rollup(regioes.estados, delta, _chaves_estados(delta)),
+        cidades=estender_rollup(regioes.cidades, delta, _chaves_cidades(delta)),
+        centroides_cep=regioes.centroides_cep,
+        centroides_estados=_centroides_por(tabela, ['customer_state'], regioes.centroides_cep),
+        centroides_cidades=_centroides_por(tabela, ['customer_state', 'customer_city'], regioes.centroides_cep),
+    )
+
+
+def por_estado(regioes, categorias=None, pagamento=None, reviews=None):
+    estados = agregar(regioes.estados, mascara_rollup(regioes.estados, categorias, pagamento, reviews))
+    estados = estados.join(regioes.centroides_estados)
+    estados.index.name = 'Estado'
+    return estados.sort_values('Pedidos', ascending=False, kind='stable')
+
+
+def por_cidade(regioes, estado, categorias=None, pagamento=None, reviews=None, limite=20):
+    mascara = mascara_rollup(regioes.cidades, categorias, pagamento, reviews)
+    mascara &= (regioes.cidades.baldes['customer_state'] == estado).to_numpy()
+    cidades = agregar(regioes.cidades, mascara).join(regioes.centroides_cidades)
+    cidades = cidades.droplevel('customer_state')
+    cidades.index.name = 'Cidade'
+    return cidades.sort_values('Pedidos', ascending=False, kind='stable').head(limite)
@@ -0,0 +1,175 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.artist import setp
+from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.figure import Figure
+
+from .instrumentacao import registrar_falha_cache
+
+
+MAX_FIGURAS = 64
+
+LIMITE_BYTES = 64 * 1024 * 1024
+
+_cache = OrderedDict()
+_bytes_em_cache = 0
+_trava = threading.Lock()
+
+
+CORES = ['#8ecae6', '#219ebc', '#023047', '#ffb703', '#fb8500']
+
+
+def _rotulo_contagem(valor):
+    return f'{valor:,.0f}' if valor > 0 else ''
+
+
+def _barras_empilhadas(ax, tabela_cruzada):
+    posicoes = np.arange(len(tabela_cruzada))
+    valores = tabela_cruzada.to_numpy(dtype='float64')
+    bases = np.cumsum(valores, axis=1) - valores
+
+    for i, rotulo in enumerate(tabela_cruzada.columns):
+        barras = ax.bar(posicoes, valores[:, i], bottom=bases[:, i],
+                        label=rotulo, color=CORES[i % len(CORES)], alpha=0.8)
+        ax.bar_label(barras, fmt=_rotulo_contagem, label_type='center',
+                     color='black', fontsize=8, fontweight='bold')
+
+    ax.set_xticks(posicoes)
+    ax.set_xticklabels(tabela_cruzada.index, rotation=45, ha='right', fontsize=10)
+
+
+def _pizza(ax, dados, cores):
+    _, _, autotexts = ax.pie(dados.to_numpy(), labels=dados.index, autopct='%1.1f%%',
+                             startangle=90, colors=cores)
+    ax.axis('equal')
+    setp(autotexts, color='white', fontweight='bold')
+
+
+def barras_categoria(dados_grafico):
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+
+    posicoes = np.arange(len(dados_grafico))
+    barras = ax.bar(posicoes, dados_grafico.to_numpy(), color='#219ebc')
+    ax.bar_label(barras, fmt='{:,.0f}', fontsize=9)
+    ax.set_xlabel('Categorias de Produtos', fontsize=12)
+    ax.set_ylabel('Quantidade de Vendas', fontsize=12)
+    ax.set_title('Distribuição por Categoria de Produto', fontsize=14)
+    ax.set_xticks(posicoes)
+    ax.set_xticklabels(dados_grafico.index, rotation=45, ha='right', fontsize=10)
+
+    fig.tight_layout()
+    return fig
+
+
+def pizza_pagamento(dados_pagamento):
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+
+    _pizza(ax, dados_pagamento, CORES[:4])
+    ax.set_title('Distribuição por Tipo de Pagamento', fontsize=14, pad=20)
+
+    fig.tight_layout()
+    return fig
+
+
+def pizza_review(dados_review):
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+
+    _pizza(ax, dados_review, CORES)
+    ax.set_title('Distribuição por Nota de Avaliação', fontsize=14, pad=20)
+
+    fig.tight_layout()
+    return fig
+
+
+def barras_pagamento_categoria(tabela_cruzada):
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+
+    _barras_empilhadas(ax, tabela_cruzada)
+    ax.set_xlabel('Categorias de Produtos', fontsize=12)
+    ax.set_ylabel('Quantidade', fontsize=12)
+    ax.set_title('Distribuição de Pagamentos por Categoria', fontsize=14)
+    ax.legend(title='Tipo de Pagamento', bbox_to_anchor=(1.05, 1), loc='upper left')
+
+    fig.tight_layout()
+    return fig
+
+
+def barras_review_categoria(tabela_cruzada):
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+
+    _barras_empilhadas(ax, tabela_cruzada)
+    ax.set_xlabel('Categorias de Produtos', fontsize=12)
+    ax.set_ylabel('Quantidade', fontsize=12)
+    ax.set_title('Distribuição de Avaliações por Categoria', fontsize=14)
+    ax.legend(title='Nota', bbox_to_anchor=(1.05, 1), loc='upper left')
+
+    fig.tight_layout()
+    return fig
+
+
+def heatmap_pagamento_review(tabela_normalizada):
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+
+    custom_cmap = LinearSegmentedColormap.from_list('coolors_cmap', CORES)
+
+    sns.heatmap(tabela_normalizada, annot=True, fmt=".2%", cmap=custom_cmap,
+               cbar_kws={'label': 'Proporção'}, ax=ax,
+               linewidths=0.5, linecolor='black')
+
+    ax.set_xlabel('Nota de Avaliação', fontsize=12)
+    ax.set_ylabel('Tipo de Pagamento', fontsize=12)
+    ax.set_title('Proporção de Avaliações por Tipo de Pagamento', fontsize=14)
+
+    fig.tight_layout()
+    return fig
+
+
+def chave_grafico(desenhar, dados):
+    resumo = hashlib.blake2b(desenhar.__name__.encode('utf-8'), digest_size=16)
+    resumo.update(pd.util.hash_pandas_object(dados, index=True).to_numpy().tobytes())
+    nomes = list(dados.columns) if isinstance(dados, pd.DataFrame) else [dados.name]
+    resumo.update(repr(nomes).encode('utf-8'))
+    return resumo.hexdigest()
+
+
+def _salvar_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=200, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def renderizar(desenhar, dados, usar_cache=True):
+    global _bytes_em_cache
+
+    chave = chave_grafico(desenhar, dados)
+    with _trava:
+        if usar_cache and chave in _cache:
+            _cache.move_to_end(chave)
+            return _cache[chave]
+
+    registrar_falha_cache()
+    png = _salvar_png(desenhar(dados))
+
+    if not usar_cache:
+        return png
+
+    with _trava:
+        if chave not in _cache:
+            _cache[chave] = png
+            _bytes_em_cache += len(png)
+        while _cache and (len(_cache) > MAX_FIGURAS or _bytes_em_cache > LIMITE_BYTES):
+            _, removido = _cache.popitem(last=False)
+            _bytes_em_cache -= len(removido)
+    return png
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+
+# Erro padrão relativo de 1.04 / sqrt(2 ** PRECISAO): cerca de 1,6% com 4096 registros.
+PRECISAO = 12
+
+
+def erro_padrao(precisao=PRECISAO):
+    return 1.04 / np.sqrt(2 ** precisao)
+
+
+def hash_ids(valores):
+    return pd.util.hash_array(np.asarray(valores), categorize=True)
+
+
+def _bit_length(valores):
+    valores = valores.copy()
+    tamanho = np.zeros(valores.shape, dtype=np.int64)
+    for deslocamento in (32, 16, 8, 4, 2, 1):
+        maiores = valores >= (np.uint64(1) << np.uint64(deslocamento))
+        tamanho[maiores] += deslocamento
+        valores[maiores] >>= np.uint64(deslocamento)
+    return tamanho + (valores > 0)
+
+
+def registros_por_grupo(hashes, grupos, n_grupos, precisao=PRECISAO):
+    m = 2 ** precisao
+    bits_resto = 64 - precisao
+    posicao = (hashes >> np.uint64(bits_resto)).astype(np.int64)
+    resto = hashes & np.uint64((1 << bits_resto) - 1)
+    rank = (bits_resto - _bit_length(resto) + 1).astype(np.uint8)
+
+    chave = np.asarray(grupos, dtype=np.int64) * m + posicao
+    maximos = pd.Series(rank).groupby(chave).max()
+
+    registros = np.zeros(n_grupos * m, dtype=np.uint8)
+    registros[maximos.index.to_numpy()] = maximos.to_numpy()
+    return registros.reshape(n_grupos, m)
+
+
+def unir(registros):
+    if len(registros) == 0:
+        return np.zeros(registros.shape[-1], dtype=np.uint8)
+    return registros.max(axis=0)
+
+
+def estimar(registros):
+    m = len(registros)
+    alfa = 0.7213 / (1 + 1.079 / m)
+    estimativa = alfa * m * m / np.sum(np.exp2(-registros.astype(np.float64)))
+
+    zerados = int(np.count_nonzero(registros == 0))
+    if estimativa <= 2.5 * m and zerados:
+        estimativa = m * np.log(m / zerados)
+    return estimativa
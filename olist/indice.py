@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class IndiceFiltros:
+    categorias: dict
+    pagamentos: dict
+    reviews: dict
+    total: int
+
+
+def _posicoes_por_valor(serie):
+    codigos, valores = pd.factorize(serie, sort=True)
+    validos = codigos >= 0
+    ordem = np.flatnonzero(validos)[np.argsort(codigos[validos], kind='stable')].astype(np.int32)
+    limites = np.cumsum(np.bincount(codigos[validos], minlength=len(valores)))[:-1]
+    ordem.flags.writeable = False
+    return dict(zip(list(valores), np.split(ordem, limites)))
+
+
+def construir_indice(tabela):
+    return IndiceFiltros(
+        categorias=_posicoes_por_valor(tabela['product_category_name']),
+        pagamentos=_posicoes_por_valor(tabela['payment_type']),
+        reviews=_posicoes_por_valor(tabela['review_score']),
+        total=len(tabela),
+    )
+
+
+def _estender(mapa, novos, inicio):
+    estendido = dict(mapa)
+    for valor, posicoes in novos.items():
+        posicoes = posicoes + np.int32(inicio)
+        if valor in mapa:
+            posicoes = np.concatenate([mapa[valor], posicoes])
+        posicoes.flags.writeable = False
+        estendido[valor] = posicoes
+    return estendido
+
+
+def estender_indice(indice, tabela, inicio):
+    novos = construir_indice(tabela.iloc[inicio:])
+    return IndiceFiltros(
+        categorias=_estender(indice.categorias, novos.categorias, inicio),
+        pagamentos=_estender(indice.pagamentos, novos.pagamentos, inicio),
+        reviews=_estender(indice.reviews, novos.reviews, inicio),
+        total=len(tabela),
+    )
+
+
+def _unir(mapa, selecionados):
+    partes = [mapa[valor] for valor in selecionados if valor in mapa]
+    if not partes:
+        return np.empty(0, dtype=np.int32)
+    if len(partes) == 1:
+        return partes[0]
+    return np.sort(np.concatenate(partes))
+
+
+def filtrar_posicoes(indice, categorias=None, pagamento=None, reviews=None):
+    conjuntos = []
+    if categorias:
+        conjuntos.append(_unir(indice.categorias, categorias))
+    if pagamento:
+        conjuntos.append(_unir(indice.pagamentos, [pagamento]))
+    if reviews:
+        conjuntos.append(_unir(indice.reviews, reviews))
+
+    if not conjuntos:
+        return None
+    conjuntos.sort(key=len)
+    posicoes = conjuntos[0]
+    for outro in conjuntos[1:]:
+        posicoes = np.intersect1d(posicoes, outro, assume_unique=True)
+    return posicoes
@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+VALORES_ATIVOS = ('1', 'true', 'sim', 'on')
+
+logger = logging.getLogger('olist.instrumentacao')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_local = threading.local()
+
+
+def instrumentacao_ativa(parametros=None):
+    if os.environ.get('OLIST_INSTRUMENTACAO', '').lower() in VALORES_ATIVOS:
+        return True
+    return str((parametros or {}).get('instrumentacao', '')).lower() in VALORES_ATIVOS
+
+
+def registrar_falha_cache():
+    _local.falha_cache = True
+
+
+def rss_atual_mb():
+    try:
+        with open('/proc/self/statm') as arquivo:
+            paginas_residentes = int(arquivo.read().split()[1])
+        return paginas_residentes * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Medidor:
+    def __init__(self, ativo=True, sessao=None):
+        self.ativo = ativo
+        self.sessao = sessao
+        self.etapas = []
+        self.inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nome, cache=False):
+        registro = {'etapa': nome}
+        if not self.ativo:
+            yield registro
+            return
+
+        if cache:
+            _local.falha_cache = False
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro['duracao_ms'] = (time.perf_counter() - inicio) * 1000
+            if cache:
+                registro['cache'] = 'miss' if getattr(_local, 'falha_cache', False) else 'hit'
+            registro['rss_mb'] = rss_atual_mb()
+            self.etapas.append(registro)
+
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def tabela(self):
+        tabela = pd.DataFrame(self.etapas)
+        for coluna in ('linhas', 'cache'):
+            if coluna not in tabela:
+                tabela[coluna] = None
+        return tabela[['etapa', 'duracao_ms', 'linhas', 'cache', 'rss_mb']]
+
+    def emitir_log(self, **extras):
+        if not self.ativo:
+            return
+        logger.info(json.dumps({
+            'evento': 'rerun',
+            'sessao': self.sessao,
+            'total_ms': self.total_ms(),
+            'etapas': self.etapas,
+            **extras,
+        }, default=str))
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+
+TAMANHOS_PAGINA = [25, 50, 100, 250]
+
+
+def total_paginas(total_linhas, tamanho):
+    return max(1, -(-total_linhas // tamanho))
+
+
+def ordem_linhas(serie, crescente=True):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        posto = np.argsort(np.argsort(serie.cat.categories.to_numpy(), kind='stable'))
+        codigos = serie.cat.codes.to_numpy()
+        validos = codigos >= 0
+        chave = np.full(len(codigos), len(posto) if crescente else 1, dtype=np.int64)
+        chave[validos] = posto[codigos[validos]] if crescente else -posto[codigos[validos]]
+    else:
+        if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+            chave = serie.to_numpy(dtype='int64', na_value=0).astype('float64')
+            chave[serie.isna().to_numpy()] = np.nan
+        else:
+            chave = serie.to_numpy(dtype='float64', na_value=np.nan)
+        if not crescente:
+            chave = -chave
+    return np.argsort(chave, kind='stable').astype(np.int32)
+
+
+def posicoes_da_pagina(total, posicoes=None, ordem=None, pagina=1, tamanho=TAMANHOS_PAGINA[0]):
+    inicio = (pagina - 1) * tamanho
+    if ordem is None:
+        if posicoes is None:
+            return np.arange(inicio, min(inicio + tamanho, total), dtype=np.int32)
+        return posicoes[inicio:inicio + tamanho]
+
+    if posicoes is not None:
+        marcados = np.zeros(total, dtype=bool)
+        marcados[posicoes] = True
+        ordem = ordem[marcados[ordem]]
+    return ordem[inicio:inicio + tamanho]
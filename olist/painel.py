@@ -0,0 +1,217 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from . import cubo, graficos, hll
+
+
+COMBINACOES = [
+    (False, False, False),
+    (True, False, False),
+    (False, True, False),
+    (False, False, True),
+    (True, True, False),
+    (True, False, True),
+    (False, True, True),
+    (True, True, True),
+]
+
+TRADUCAO_PAGAMENTO = {
+    'boleto': 'Boleto',
+    'credit_card': 'Crédito',
+    'debit_card': 'Débito',
+    'voucher': 'Voucher'
+}
+
+TOP_CATEGORIAS = {
+    'barras': 15,
+    'pagamento': 10,
+    'review': 5,
+}
+
+
+@dataclass
+class Metrica:
+    rotulo: str
+    valor: str
+    ajuda: str = None
+
+
+@dataclass
+class BaseGraficos:
+    ranking_categorias: pd.Series
+    rotulos_pagamento: dict
+    rotulos_review: dict
+    pagamentos: pd.Series
+    reviews: pd.Series
+    categoria_pagamento: pd.DataFrame
+    categoria_review: pd.DataFrame
+    pagamento_review: pd.DataFrame
+
+
+def nome_combinacao(combinacao):
+    nomes = [nome for nome, ativo in zip(['categoria', 'pagamento', 'review'], combinacao) if ativo]
+    return '+'.join(nomes) or 'nenhum'
+
+
+def indicadores(cubo_olap, fatia, combinacao, aproximado=False):
+    checkbox_cat, checkbox_pag, checkbox_rev = combinacao
+    ajuda_distintos = None
+    if aproximado:
+        ajuda_distintos = f"Estimativa HyperLogLog (erro padrão de ±{hll.erro_padrao():.1%})"
+
+    def total_pedidos():
+        total = cubo.distintos(cubo_olap, fatia, 'pedidos', aproximado)
+        return Metrica("Total de Pedidos", f"{total:,}", ajuda_distintos)
+
+    def valor_medio_produto():
+        return Metrica("Valor Médio Produto", f"R${cubo.media(fatia, 'price'):.2f}")
+
+    def pagamento_mais_usado():
+        pagamento = cubo.contagem_por(fatia, 'payment_type').index[0]
+        return Metrica("Pagamento Mais Usado", TRADUCAO_PAGAMENTO.get(pagamento, pagamento))
+
+    def categoria_mais_frequente(rotulo):
+        return Metrica(rotulo, cubo.contagem_por(fatia, 'product_category_name').index[0])
+
+    def media_avaliacoes(rotulo):
+        return Metrica(rotulo, f"{cubo.media(fatia, 'review_score'):.2f}")
+
+    if not (checkbox_cat or checkbox_pag or checkbox_rev):
+        total_clientes = cubo.distintos(cubo_olap, fatia, 'clientes', aproximado)
+        categorias_unicas = cubo.valores_distintos(fatia, 'product_category_name')
+        return 4, [
+            total_pedidos(),
+            Metrica("Total de Clientes", f"{total_clientes:,}", ajuda_distintos),
+            Metrica("Categorias Únicas", f"{categorias_unicas:,}"),
+            media_avaliacoes("Média de Avaliações"),
+        ]
+
+    if checkbox_cat and not checkbox_pag and not checkbox_rev:
+        return 5, [
+            total_pedidos(),
+            valor_medio_produto(),
+            pagamento_mais_usado(),
+            media_avaliacoes("Média Avaliações"),
+        ]
+
+    if checkbox_pag and not checkbox_cat and not checkbox_rev:
+        return [1, 1, 1.5, 1], [
+            Metrica("Total de Pagamentos", f"{cubo.total_linhas(fatia):,}"),
+            Metrica("Valor Médio", f"R${cubo.media(fatia, 'payment_value'):.2f}"),
+            categoria_mais_frequente("Categoria Mais Frequente"),
+            media_avaliacoes("Média Avaliações"),
+        ]
+
+    if checkbox_rev and not checkbox_cat and not checkbox_pag:
+        return [1, 1.5, 1], [
+            Metrica("Total de Avaliações", f"{cubo.total_linhas(fatia):,}"),
+            categoria_mais_frequente("Categoria Mais Avaliada"),
+            valor_medio_produto(),
+        ]
+
+    if checkbox_cat and checkbox_pag and not checkbox_rev:
+        return 3, [
+            total_pedidos(),
+            valor_medio_produto(),
+            media_avaliacoes("Média das Reviews"),
+        ]
+
+    if checkbox_cat and checkbox_rev and not checkbox_pag:
+        return 3, [
+            total_pedidos(),
+            valor_medio_produto(),
+            pagamento_mais_usado(),
+        ]
+
+    if checkbox_pag and checkbox_rev and not checkbox_cat:
+        return [1, 1, 1.5], [
+            total_pedidos(),
+            valor_medio_produto(),
+            categoria_mais_frequente("Categoria Mais Comum"),
+        ]
+
+    return 2, [
+        total_pedidos(),
+        valor_medio_produto(),
+    ]
+
+
+def _ordenar_por_total(tabela_cruzada):
+    return tabela_cruzada.iloc[np.argsort(-tabela_cruzada.to_numpy().sum(axis=1), kind='stable')]
+
+
+def _cruzada_por_categoria(fatia, dimensao, rotulos):
+    tabela_cruzada = cubo.tabela_cruzada(fatia, 'product_category_name', dimensao)
+    tabela_cruzada = tabela_cruzada.rename(columns=rotulos)
+    tabela_cruzada.columns.name = None
+    tabela_cruzada.index = tabela_cruzada.index.astype('str')
+    return _ordenar_por_total(tabela_cruzada)
+
+
+def base_graficos(cubo_olap):
+    celulas = cubo_olap.celulas
+    ranking = cubo.contagem_por(celulas, 'product_category_name')
+    ranking.index = ranking.index.astype('str')
+    rotulos_pagamento = {
+        pagamento: TRADUCAO_PAGAMENTO.get(pagamento, pagamento)
+        for pagamento in celulas['payment_type'].dropna().unique()
+    }
+    rotulos_review = {nota: f'Nota {nota}' for nota in sorted(celulas['review_score'].dropna().unique())}
+
+    pagamentos = cubo.contagem_por(celulas, 'payment_type').rename(rotulos_pagamento)
+    pagamentos.index = pagamentos.index.astype('str')
+    reviews = cubo.contagem_por(celulas, 'review_score').sort_index().rename(rotulos_review)
+
+    pagamento_review = cubo.tabela_cruzada(celulas, 'payment_type', 'review_score')
+    pagamento_review = pagamento_review.div(pagamento_review.sum(axis=1), axis=0)
+    pagamento_review.index = pagamento_review.index.astype('str').map(lambda valor: rotulos_pagamento.get(valor, valor))
+
+    def cruzada_top(dimensao, rotulos, quantidade):
+        fatia = cubo.fatiar(cubo_olap, categorias=ranking.index[:quantidade].tolist())
+        return _cruzada_por_categoria(fatia, dimensao, rotulos)
+
+    return BaseGraficos(
+        ranking_categorias=ranking,
+        rotulos_pagamento=rotulos_pagamento,
+        rotulos_review=rotulos_review,
+        pagamentos=pagamentos,
+        reviews=reviews,
+        categoria_pagamento=cruzada_top('payment_type', rotulos_pagamento, TOP_CATEGORIAS['pagamento']),
+        categoria_review=cruzada_top('review_score', rotulos_review, TOP_CATEGORIAS['review']),
+        pagamento_review=pagamento_review,
+    )
+
+
+def grafico(base, fatia, combinacao, categorias_selecionadas=None):
+    checkbox_cat, checkbox_pag, checkbox_rev = combinacao
+
+    if checkbox_cat and not checkbox_pag and not checkbox_rev:
+        if categorias_selecionadas:
+            dados_grafico = cubo.contagem_por(fatia, 'product_category_name')
+            dados_grafico.index = dados_grafico.index.astype('str')
+        else:
+            dados_grafico = base.ranking_categorias.head(TOP_CATEGORIAS['barras'])
+        return graficos.barras_categoria, dados_grafico
+
+    if checkbox_pag and not checkbox_cat and not checkbox_rev:
+        return graficos.pizza_pagamento, base.pagamentos
+
+    if checkbox_rev and not checkbox_cat and not checkbox_pag:
+        return graficos.pizza_review, base.reviews
+
+    if checkbox_cat and checkbox_pag and not checkbox_rev:
+        if categorias_selecionadas:
+            return graficos.barras_pagamento_categoria, _cruzada_por_categoria(fatia, 'payment_type', base.rotulos_pagamento)
+        return graficos.barras_pagamento_categoria, base.categoria_pagamento
+
+    if checkbox_cat and checkbox_rev and not checkbox_pag:
+        if categorias_selecionadas:
+            return graficos.barras_review_categoria, _cruzada_por_categoria(fatia, 'review_score', base.rotulos_review)
+        return graficos.barras_review_categoria, base.categoria_review
+
+    if checkbox_pag and checkbox_rev and not checkbox_cat:
+        return graficos.heatmap_pagamento_review, base.pagamento_review
+
+    return None
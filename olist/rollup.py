@@ -0,0 +1,138 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .cubo import DIMENSOES, codigos_inteiros, mascara_filtros
+
+
+@dataclass
+class Rollup:
+    chaves: list
+    baldes: pd.DataFrame
+    pedidos: np.ndarray
+    limites: np.ndarray
+    total_pedidos: int
+
+
+def atraso_entrega(tabela):
+    atraso = tabela['order_delivered_customer_date'] - tabela['order_estimated_delivery_date']
+    return (atraso / pd.Timedelta(days=1)).to_numpy(dtype='float64', na_value=np.nan)
+
+
+def construir_rollup(tabela, chaves, extras=None):
+    extras = extras or {}
+    base = tabela[DIMENSOES].copy()
+    for chave, valores in chaves.items():
+        base[chave] = valores
+    base['receita'] = tabela['price'].astype('float64') / tabela['linhas_por_item']
+    base['review_score'] = tabela['review_score'].astype('float64')
+    base['atraso'] = atraso_entrega(tabela)
+    for nome, (valores, _) in extras.items():
+        base[nome] = valores
+
+    agrupado = base.groupby(DIMENSOES + list(chaves), observed=True, dropna=False, sort=True)
+    baldes = agrupado.agg(
+        linhas=('review_score', 'size'),
+        soma_receita=('receita', 'sum'),
+        soma_review_score=('review_score', 'sum'),
+        soma_atraso=('atraso', 'sum'),
+        n_atraso=('atraso', 'count'),
+        **{nome: (nome, funcao) for nome, (_, funcao) in extras.items()},
+    ).reset_index()
+
+    pedidos, total_pedidos = codigos_inteiros(tabela['order_id'])
+    pedidos, limites = _conjuntos(agrupado.ngroup().to_numpy(), pedidos, len(baldes), total_pedidos)
+
+    return Rollup(
+        chaves=list(chaves),
+        baldes=baldes,
+        pedidos=pedidos,
+        limites=limites,
+        total_pedidos=total_pedidos
+    )
+
+
+def _conjuntos(balde, pedidos, n_baldes, total_pedidos):
+    pares = np.unique(balde.astype(np.int64) * total_pedidos + pedidos)
+    limites = np.searchsorted(pares // total_pedidos, np.arange(n_baldes + 1))
+    pedidos = (pares % total_pedidos).astype(np.int32)
+    pedidos.flags.writeable = False
+    return pedidos, limites
+
+
+def estender_rollup(rollup, delta, chaves, extras=None):
+    extras = extras or {}
+    novo = construir_rollup(delta, chaves, extras)
+    grupos = DIMENSOES + rollup.chaves
+
+    baldes = pd.concat([rollup.baldes, novo.baldes], ignore_index=True)
+    for coluna in grupos:
+        if isinstance(novo.baldes[coluna].dtype, pd.CategoricalDtype):
+            baldes[coluna] = baldes[coluna].astype(novo.baldes[coluna].dtype)
+
+    agrupado = baldes.groupby(grupos, observed=True, dropna=False, sort=True)
+    combinados = agrupado.agg(**{
+        coluna: (coluna, extras[coluna][1] if coluna in extras else 'sum')
+        for coluna in baldes.columns
+        if coluna not in grupos
+    }).reset_index()
+
+    # O delta só traz pedidos inéditos (pedidos alterados forçam reconstrução), então os conjuntos de
+    # um balde antigo e de um novo são disjuntos e basta posicioná-los lado a lado.
+    balde = agrupado.ngroup().to_numpy()
+    anteriores = len(rollup.baldes)
+    tamanhos = np.concatenate([np.diff(rollup.limites), np.diff(novo.limites)])
+    limites = np.concatenate([[0], np.cumsum(np.bincount(balde, weights=tamanhos, minlength=len(combinados)))]).astype(np.int64)
+
+    ocupados = np.zeros(len(combinados), dtype=np.int64)
+    ocupados[balde[:anteriores]] = tamanhos[:anteriores]
+    destinos = limites[balde]
+    destinos[anteriores:] += ocupados[balde[anteriores:]]
+    origens = np.cumsum(tamanhos) - tamanhos
+
+    pedidos = np.empty(limites[-1], dtype=np.int32)
+    pedidos[np.repeat(destinos - origens, tamanhos) + np.arange(limites[-1])] = np.concatenate([rollup.pedidos, novo.pedidos])
+    pedidos.flags.writeable = False
+
+    return Rollup(
+        chaves=rollup.chaves,
+        baldes=combinados,
+        pedidos=pedidos,
+        limites=limites,
+        total_pedidos=novo.total_pedidos
+    )
+
+
+def mascara_rollup(rollup, categorias=None, pagamento=None, reviews=None):
+    baldes = rollup.baldes
+    mascara = mascara_filtros(baldes, categorias, pagamento, reviews)
+    for chave in rollup.chaves:
+        mascara &= baldes[chave].notna().to_numpy()
+    return mascara
+
+
+def pedidos_selecionados(rollup, selecionados):
+    inicios = rollup.limites[selecionados]
+    comprimentos = rollup.limites[selecionados + 1] - inicios
+    deslocamentos = np.arange(comprimentos.sum()) - np.repeat(np.cumsum(comprimentos) - comprimentos, comprimentos)
+    return rollup.pedidos[np.repeat(inicios, comprimentos) + deslocamentos], comprimentos
+
+
+def _pedidos_por_grupo(rollup, selecionados, grupos):
+    pedidos, comprimentos = pedidos_selecionados(rollup, selecionados)
+    pares = np.unique(np.repeat(grupos, comprimentos).astype(np.int64) * rollup.total_pedidos + pedidos)
+    return np.bincount(pares // rollup.total_pedidos, minlength=grupos.max() + 1 if len(grupos) else 0)
+
+
+def agregar(rollup, mascara):
+    selecionados = np.flatnonzero(mascara)
+    agrupado = rollup.baldes.iloc[selecionados].groupby(rollup.chaves, observed=True, sort=True)
+    somas = agrupado[['linhas', 'soma_receita', 'soma_review_score', 'soma_atraso', 'n_atraso']].sum()
+
+    return pd.DataFrame({
+        'Receita': somas['soma_receita'].to_numpy(),
+        'Pedidos': _pedidos_por_grupo(rollup, selecionados, agrupado.ngroup().to_numpy()),
+        'Avaliação média': (somas['soma_review_score'] / somas['linhas']).to_numpy(),
+        'Atraso médio (dias)': (somas['soma_atraso'] / somas['n_atraso'].where(somas['n_atraso'] > 0)).to_numpy(),
+    }, index=somas.index)
@@ -0,0 +1,151 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+PEDIDOS_OLIST = 99_441
+
+CATEGORIAS = [
+    'cama_mesa_banho', 'beleza_saude', 'esporte_lazer', 'moveis_decoracao',
+    'informatica_acessorios', 'utilidades_domesticas', 'relogios_presentes',
+    'telefonia', 'ferramentas_jardim', 'automotivo', 'brinquedos', 'cool_stuff',
+    'perfumaria', 'bebes', 'eletronicos', 'papelaria', 'fashion_bolsas_e_acessorios',
+    'pet_shop', 'moveis_escritorio', 'consoles_games',
+]
+PAGAMENTOS = ['credit_card', 'boleto', 'voucher', 'debit_card', 'not_defined']
+ESTADOS = ['SP', 'RJ', 'MG', 'RS', 'PR', 'SC', 'BA', 'DF', 'GO', 'ES', 'PE', 'CE']
+STATUS = ['delivered', 'shipped', 'canceled', 'unavailable', 'invoiced', 'processing']
+
+
+def _hex(rng, n):
+    digitos = np.frombuffer(b'0123456789abcdef', dtype='S1')
+    bytes_aleatorios = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    nibbles = np.stack([bytes_aleatorios >> 4, bytes_aleatorios & 0x0F], axis=-1).reshape(n, 32)
+    return digitos[nibbles].view('S32').ravel().astype(str)
+
+
+def _sequencias(tamanhos):
+    inicios = np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+    return np.arange(tamanhos.sum()) - inicios + 1
+
+
+def gerar_dataset(destino, escala=1, semente=0, pedidos_base=PEDIDOS_OLIST):
+    rng = np.random.default_rng(semente)
+    os.makedirs(destino, exist_ok=True)
+
+    n_pedidos = pedidos_base * escala
+    n_clientes_unicos = max(1, int(n_pedidos * 0.95))
+    n_produtos = max(1, n_pedidos // 3)
+
+    customer_id = _hex(rng, n_pedidos)
+    unicos = _hex(rng, n_clientes_unicos)
+    customer_unique_id = unicos[rng.integers(0, n_clientes_unicos, n_pedidos)]
+    zip_prefix = rng.integers(1000, 99999, n_pedidos)
+    estado = rng.choice(ESTADOS, n_pedidos)
+    pd.DataFrame({
+        'customer_id': customer_id,
+        'customer_unique_id': customer_unique_id,
+        'customer_zip_code_prefix': zip_prefix,
+        'customer_city': pd.Series(estado).str.lower() + '_cidade_' + (zip_prefix % 7).astype(str),
+        'customer_state': estado,
+    }).to_csv(os.path.join(destino, 'olist_customers_dataset.csv'), index=False)
+
+    n_geo = n_pedidos * 2
+    pd.DataFrame({
+        'geolocation_zip_code_prefix': rng.choice(zip_prefix, n_geo),
+        'geolocation_lat': rng.uniform(-33, 5, n_geo),
+        'geolocation_lng': rng.uniform(-73, -35, n_geo),
+        'geolocation_city': 'cidade',
+        'geolocation_state': rng.choice(ESTADOS, n_geo),
+    }).to_csv(os.path.join(destino, 'olist_geolocation_dataset.csv'), index=False)
+
+    product_id = _hex(rng, n_produtos)
+    categoria = rng.choice(CATEGORIAS, n_produtos)
+    categoria = np.where(rng.random(n_produtos) < 0.02, None, categoria)
+    pd.DataFrame({
+        'product_id': product_id,
+        'product_category_name': categoria,
+        'product_name_lenght': rng.integers(5, 70, n_produtos),
+        'product_description_lenght': rng.integers(20, 3000, n_produtos),
+        'product_photos_qty': rng.integers(1, 10, n_produtos),
+        'product_weight_g': rng.integers(50, 30000, n_produtos),
+        'product_length_cm': rng.integers(10, 100, n_produtos),
+        'product_height_cm': rng.integers(2, 100, n_produtos),
+        'product_width_cm': rng.integers(6, 100, n_produtos),
+    }).to_csv(os.path.join(destino, 'olist_products_dataset.csv'), index=False)
+
+    order_id = _hex(rng, n_pedidos)
+    compra = pd.Timestamp('2017-01-01') + pd.to_timedelta(rng.integers(0, 600 * 86400, n_pedidos), unit='s')
+    aprovacao = compra + pd.to_timedelta(rng.integers(600, 86400, n_pedidos), unit='s')
+    transportadora = aprovacao + pd.to_timedelta(rng.integers(1, 5, n_pedidos), unit='D')
+    entrega = transportadora + pd.to_timedelta(rng.integers(1, 25, n_pedidos), unit='D')
+    estimada = compra + pd.to_timedelta(rng.integers(10, 40, n_pedidos), unit='D')
+    status = rng.choice(STATUS, n_pedidos, p=[0.9, 0.04, 0.02, 0.01, 0.02, 0.01])
+    nao_entregue = status != 'delivered'
+    formato = '%Y-%m-%d %H:%M:%S'
+    pd.DataFrame({
+        'order_id': order_id,
+        'customer_id': customer_id,
+        'order_status': status,
+        'order_purchase_timestamp': compra.strftime(formato),
+        'order_approved_at': aprovacao.strftime(formato),
+        'order_delivered_carrier_date': transportadora.strftime(formato),
+        'order_delivered_customer_date': pd.Series(entrega.strftime(formato)).mask(nao_entregue),
+        'order_estimated_delivery_date': estimada.normalize().strftime(formato),
+    }).to_csv(os.path.join(destino, 'olist_orders_dataset.csv'), index=False)
+
+    itens_por_pedido = rng.choice([1, 1, 1, 1, 2, 2, 3], n_pedidos)
+    idx_pedido = np.repeat(np.arange(n_pedidos), itens_por_pedido)
+    n_itens = len(idx_pedido)
+    sequencia = _sequencias(itens_por_pedido)
+    pd.DataFrame({
+        'order_id': order_id[idx_pedido],
+        'order_item_id': sequencia,
+        'product_id': product_id[rng.integers(0, n_produtos, n_itens)],
+        'seller_id': _hex(rng, n_itens),
+        'shipping_limit_date': (compra[idx_pedido] + pd.Timedelta(days=3)).strftime(formato),
+        'price': rng.gamma(2.0, 60.0, n_itens).round(2),
+        'freight_value': rng.gamma(2.0, 10.0, n_itens).round(2),
+    }).to_csv(os.path.join(destino, 'olist_order_items_dataset.csv'), index=False)
+
+    pagamentos_por_pedido = rng.choice([1, 1, 1, 1, 1, 2], n_pedidos)
+    idx_pagamento = np.repeat(np.arange(n_pedidos), pagamentos_por_pedido)
+    n_pagamentos = len(idx_pagamento)
+    tipo = rng.choice(PAGAMENTOS, n_pagamentos, p=[0.73, 0.19, 0.05, 0.0295, 0.0005])
+    pd.DataFrame({
+        'order_id': order_id[idx_pagamento],
+        'payment_sequential': _sequencias(pagamentos_por_pedido),
+        'payment_type': tipo,
+        'payment_installments': np.where(tipo == 'credit_card', rng.integers(1, 11, n_pagamentos), 1),
+        'payment_value': rng.gamma(2.0, 80.0, n_pagamentos).round(2),
+    }).to_csv(os.path.join(destino, 'olist_order_payments_dataset.csv'), index=False)
+
+    com_review = rng.random(n_pedidos) < 0.99
+    idx_review = np.flatnonzero(com_review)
+    idx_review = np.concatenate([idx_review, rng.choice(idx_review, max(1, len(idx_review) // 200))])
+    n_reviews = len(idx_review)
+    pd.DataFrame({
+        'review_id': _hex(rng, n_reviews),
+        'order_id': order_id[idx_review],
+        'review_score': rng.choice([1, 2, 3, 4, 5], n_reviews, p=[0.11, 0.03, 0.08, 0.19, 0.59]),
+        'review_comment_title': np.where(rng.random(n_reviews) < 0.1, 'recomendo', None),
+        'review_comment_message': np.where(rng.random(n_reviews) < 0.4, 'produto chegou no prazo, muito bom', None),
+        'review_creation_date': (compra[idx_review] + pd.Timedelta(days=10)).normalize().strftime(formato),
+        'review_answer_timestamp': (compra[idx_review] + pd.Timedelta(days=12)).strftime(formato),
+    }).to_csv(os.path.join(destino, 'olist_order_reviews_dataset.csv'), index=False)
+
+    n_vendedores = max(1, n_pedidos // 30)
+    pd.DataFrame({
+        'seller_id': _hex(rng, n_vendedores),
+        'seller_zip_code_prefix': rng.integers(1000, 99999, n_vendedores),
+        'seller_city': 'cidade',
+        'seller_state': rng.choice(ESTADOS, n_vendedores),
+    }).to_csv(os.path.join(destino, 'olist_sellers_dataset.csv'), index=False)
+
+    pd.DataFrame({
+        'product_category_name': CATEGORIAS,
+        'product_category_name_english': [c + '_en' for c in CATEGORIAS],
+    }).to_csv(os.path.join(destino, 'product_category_name_translation.csv'), index=False)
+
+    return destino
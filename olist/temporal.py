@@ -0,0 +1,51 @@
+import pandas as pd
+
+from .rollup import agregar, construir_rollup, estender_rollup, mascara_rollup
+
+
+GRANULARIDADES = {
+    'Diária': 'D',
+    'Mensal': 'M',
+}
+
+COLUNA_DATA = 'order_purchase_timestamp'
+
+
+def _chaves(tabela, frequencia):
+    return {'periodo': tabela[COLUNA_DATA].dt.to_period(frequencia).dt.start_time.to_numpy()}
+
+
+def construir_rollups(tabela):
+    return {
+        frequencia: construir_rollup(tabela, _chaves(tabela, frequencia))
+        for frequencia in GRANULARIDADES.values()
+    }
+
+
+def estender_rollups(rollups, tabela, inicio):
+    delta = tabela.iloc[inicio:]
+    return {
+        frequencia: estender_rollup(rollups[frequencia], delta, _chaves(delta, frequencia))
+        for frequencia in GRANULARIDADES.values()
+    }
+
+
+def intervalo(rollups):
+    periodos = rollups['D'].baldes['periodo'].dropna()
+    if periodos.empty:
+        return None
+    return periodos.min().date(), periodos.max().date()
+
+
+def serie(rollups, frequencia, categorias=None, pagamento=None, reviews=None, inicio=None, fim=None):
+    rollup = rollups[frequencia]
+    periodos = rollup.baldes['periodo']
+    mascara = mascara_rollup(rollup, categorias, pagamento, reviews)
+    if inicio is not None:
+        mascara &= (periodos >= pd.Period(inicio, frequencia).start_time).to_numpy()
+    if fim is not None:
+        mascara &= (periodos <= pd.Period(fim, frequencia).start_time).to_numpy()
+
+    resultado = agregar(rollup, mascara)
+    resultado.index.name = 'Período'
+    return resultado
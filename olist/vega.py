@@ -0,0 +1,151 @@
+import threading
+from collections import OrderedDict
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from . import graficos
+from .graficos import CORES
+from .instrumentacao import registrar_falha_cache
+
+
+ALTURA = 520
+
+MAX_ESPECIFICACOES = 128
+
+_cache = OrderedDict()
+_trava = threading.Lock()
+
+
+def _escala_cores(dominio):
+    return alt.Scale(domain=list(dominio), range=CORES[:len(dominio)])
+
+
+def barras_categoria(dados_grafico):
+    dados = pd.DataFrame({
+        'Categoria': dados_grafico.index.astype('str'),
+        'Vendas': dados_grafico.to_numpy(),
+    })
+    base = alt.Chart(dados).encode(
+        x=alt.X('Categoria:N', sort=None, title='Categorias de Produtos', axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y('Vendas:Q', title='Quantidade de Vendas'),
+        tooltip=['Categoria', alt.Tooltip('Vendas:Q', format=',')],
+    )
+    barras = base.mark_bar(color=CORES[1])
+    rotulos = base.mark_text(dy=-6, fontSize=10).encode(text=alt.Text('Vendas:Q', format=','))
+    return (barras + rotulos).properties(
+        title='Distribuição por Categoria de Produto', height=ALTURA
+    ).interactive(bind_x=False)
+
+
+def _pizza(dados_grafico, titulo, rotulo):
+    dados = pd.DataFrame({
+        rotulo: dados_grafico.index.astype('str'),
+        'Quantidade': dados_grafico.to_numpy(),
+    })
+    dados['Proporção'] = dados['Quantidade'] / dados['Quantidade'].sum()
+    base = alt.Chart(dados).encode(
+        theta=alt.Theta('Quantidade:Q', stack=True),
+        color=alt.Color(f'{rotulo}:N', sort=None, scale=_escala_cores(dados[rotulo])),
+        order=alt.Order('ordem:Q'),
+        tooltip=[rotulo, alt.Tooltip('Quantidade:Q', format=','), alt.Tooltip('Proporção:Q', format='.1%')],
+    ).transform_window(ordem='row_number()')
+    fatias = base.mark_arc(outerRadius=200)
+    rotulos = base.mark_text(radius=140, fontSize=13, fontWeight='bold', color='white').encode(
+        text=alt.Text('Proporção:Q', format='.1%')
+    )
+    return (fatias + rotulos).properties(title=titulo, height=ALTURA)
+
+
+def pizza_pagamento(dados_pagamento):
+    return _pizza(dados_pagamento, 'Distribuição por Tipo de Pagamento', 'Pagamento')
+
+
+def pizza_review(dados_review):
+    return _pizza(dados_review, 'Distribuição por Nota de Avaliação', 'Nota')
+
+
+def _barras_empilhadas(tabela_cruzada, titulo, legenda):
+    valores = tabela_cruzada.to_numpy(dtype='float64')
+    fins = np.cumsum(valores, axis=1)
+    series = [str(coluna) for coluna in tabela_cruzada.columns]
+    dados = pd.DataFrame({
+        'Categoria': np.repeat(tabela_cruzada.index.astype('str'), len(series)),
+        legenda: np.tile(series, len(tabela_cruzada)),
+        'Quantidade': valores.ravel(),
+        'inicio': (fins - valores).ravel(),
+        'fim': fins.ravel(),
+    })
+    dados = dados[dados['Quantidade'] > 0]
+    dados['meio'] = (dados['inicio'] + dados['fim']) / 2
+
+    base = alt.Chart(dados).encode(
+        x=alt.X('Categoria:N', sort=list(tabela_cruzada.index.astype('str')),
+                title='Categorias de Produtos', axis=alt.Axis(labelAngle=-45)),
+        tooltip=['Categoria', legenda, alt.Tooltip('Quantidade:Q', format=',')],
+    )
+    barras = base.mark_bar(opacity=0.8).encode(
+        y=alt.Y('inicio:Q', title='Quantidade'),
+        y2='fim:Q',
+        color=alt.Color(f'{legenda}:N', sort=series, scale=_escala_cores(series)),
+    )
+    rotulos = base.mark_text(fontSize=9, fontWeight='bold').encode(
+        y='meio:Q',
+        text=alt.Text('Quantidade:Q', format=','),
+    )
+    return (barras + rotulos).properties(title=titulo, height=ALTURA).interactive(bind_x=False)
+
+
+def barras_pagamento_categoria(tabela_cruzada):
+    return _barras_empilhadas(tabela_cruzada, 'Distribuição de Pagamentos por Categoria', 'Tipo de Pagamento')
+
+
+def barras_review_categoria(tabela_cruzada):
+    return _barras_empilhadas(tabela_cruzada, 'Distribuição de Avaliações por Categoria', 'Nota')
+
+
+def heatmap_pagamento_review(tabela_normalizada):
+    dados = tabela_normalizada.rename_axis(index='Pagamento', columns='Nota').stack().rename('Proporção').reset_index()
+    dados['Pagamento'] = dados['Pagamento'].astype('str')
+    dados['Nota'] = dados['Nota'].astype('str')
+
+    base = alt.Chart(dados).encode(
+        x=alt.X('Nota:O', title='Nota de Avaliação'),
+        y=alt.Y('Pagamento:N', sort=None, title='Tipo de Pagamento'),
+        tooltip=['Pagamento', 'Nota', alt.Tooltip('Proporção:Q', format='.2%')],
+    )
+    celulas = base.mark_rect(stroke='black', strokeWidth=0.5).encode(
+        color=alt.Color('Proporção:Q', scale=alt.Scale(range=CORES), legend=alt.Legend(format='.0%'))
+    )
+    rotulos = base.mark_text(fontSize=12).encode(text=alt.Text('Proporção:Q', format='.2%'))
+    return (celulas + rotulos).properties(title='Proporção de Avaliações por Tipo de Pagamento', height=ALTURA)
+
+
+EQUIVALENTES = {
+    graficos.barras_categoria: barras_categoria,
+    graficos.pizza_pagamento: pizza_pagamento,
+    graficos.pizza_review: pizza_review,
+    graficos.barras_pagamento_categoria: barras_pagamento_categoria,
+    graficos.barras_review_categoria: barras_review_categoria,
+    graficos.heatmap_pagamento_review: heatmap_pagamento_review,
+}
+
+
+def especificacao(desenhar, dados, usar_cache=True):
+    chave = graficos.chave_grafico(desenhar, dados)
+    with _trava:
+        if usar_cache and chave in _cache:
+            _cache.move_to_end(chave)
+            return _cache[chave]
+
+    registrar_falha_cache()
+    spec = EQUIVALENTES[desenhar](dados).to_dict()
+    if not usar_cache:
+        return spec
+
+    with _trava:
+        _cache[chave] = spec
+        while len(_cache) > MAX_ESPECIFICACOES:
+            _cache.popitem(last=False)
+    return spec